@@ -55,7 +55,10 @@ def build_steps(
     steps: list[tuple[str, str, list[str]]] = []
 
     if force_refresh or not outputs["market_json"].is_file():
-        steps.append(("1", "台灣風險監控報告", [PYTHON, "main.py", *date_args, "--output", output_xlsx]))
+        main_cmd = [PYTHON, "main.py", *date_args, "--output", output_xlsx]
+        if force_refresh:
+            main_cmd.append("--refresh")
+        steps.append(("1", "台灣風險監控報告", main_cmd))
         steps.append(
             (
                 "2",
@@ -9,81 +9,192 @@ import glob
 import json
 import os
 import re
+import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+from functools import lru_cache
+from types import SimpleNamespace
 
 # 匯入現有模組
+# 監控模組（pandas/yfinance）與 openpyxl 載入較慢，延後到實際使用時才匯入，
+# 讓 `python main.py --help` 等不需抓取資料的呼叫能快速啟動
 try:
-    from src.risk_monitor import RiskMonitor, get_trading_date
-    from src.risk_monitor_history import HistoricalDataFetcher
-    from src.stock_monitor import StockMonitor
+    from src import disk_cache
+    from src.excel_styles import sign_font
 except ImportError:
-    from risk_monitor import RiskMonitor, get_trading_date
-    from risk_monitor_history import HistoricalDataFetcher
-    from stock_monitor import StockMonitor
+    import disk_cache
+    from excel_styles import sign_font
+
+
+def _import_monitors():
+    """延遲匯入抓取數據所需的監控模組"""
+    try:
+        from src.risk_monitor import RiskMonitor
+        from src.risk_monitor_history import HistoricalDataFetcher
+        from src.stock_monitor import StockMonitor
+    except ImportError:
+        from risk_monitor import RiskMonitor
+        from risk_monitor_history import HistoricalDataFetcher
+        from stock_monitor import StockMonitor
+    return RiskMonitor, HistoricalDataFetcher, StockMonitor
+
+
+def _import_get_trading_date():
+    try:
+        from src.risk_monitor import get_trading_date
+    except ImportError:
+        from risk_monitor import get_trading_date
+    return get_trading_date
+
+
+def _resolve_trading_date(date_str=None) -> str:
+    """明確指定的平日直接沿用，其餘情況（未指定/週末）才交給 get_trading_date 回退"""
+    if date_str and len(date_str) == 8 and date_str.isdigit():
+        try:
+            if datetime.strptime(date_str, '%Y%m%d').weekday() < 5:
+                return date_str
+        except ValueError:
+            pass
+    return _import_get_trading_date()(date_str)
+
+
+@lru_cache(maxsize=None)
+def _styles() -> SimpleNamespace:
+    """
+    各工作表共用的樣式物件，第一次匯出時建立，之後的儲存格/工作表/匯出都共用同一組
+    （openpyxl 延遲匯入，無法在模組載入時直接定義）
+    """
+    from openpyxl.styles import Font, Alignment, PatternFill
+    
+    return SimpleNamespace(
+        # 條件格式
+        green_font=Font(color="008000"),
+        red_font=Font(color="FF0000"),
+        # 標題與表頭
+        title_font=Font(size=16, bold=True),
+        subtitle_font=Font(size=14, bold=True),
+        bold_font=Font(bold=True),
+        white_bold_font=Font(bold=True, color="FFFFFF"),
+        center_alignment=Alignment(horizontal='center'),
+        grey_fill=PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid"),
+        blue_fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+        orange_fill=PatternFill(start_color="ED7D31", end_color="ED7D31", fill_type="solid"),
+    )
+
+
+HISTORY_SECTIONS = ('institutional', 'margin', 'pc_ratio', 'futures')
 
 
 class IntegratedRiskReport:
     """整合風險報告生成器"""
     
-    def __init__(self, date_str: str, watchlist_path: str = 'data/config/watchlist.json'):
+    # 個股籌碼表各欄對應的資料欄位與預設值，順序與表頭一致
+    STOCK_SHEET_FIELDS = (
+        ('code', ''), ('name', ''), ('market', ''), ('close', None), ('pct_change', None),
+        ('volume', None), ('foreign_daily', None), ('foreign_5d_sum', None), ('trust_daily', None),
+        ('trust_5d_sum', None), ('dealer_daily', None), ('margin_daily_change', None),
+        ('margin_5d_sum', None), ('lending_daily_change', None), ('dist_ma20', None),
+        # 進階籌碼指標
+        ('broker_buy_sell_diff', None), ('chip_concentration_5d', None), ('sbl_sell_balance', None),
+        ('short_cover_days', None), ('vwap_20d_approx', None), ('vwap_bias', None),
+        ('data_source', 'N/A'),
+    )
+    
+    # 總覽表各指標的歷史統計來源：(history_data 區塊, 單位, (5日平均, 5日總和, 20日平均, 20日總和) 欄位)
+    SUMMARY_HISTORY_STATS = {
+        '外資現貨': ('institutional', '億', ('foreign_5d_avg', 'foreign_5d_sum', 'foreign_20d_avg', 'foreign_20d_sum')),
+        '投信現貨': ('institutional', '億', ('trust_5d_avg', 'trust_5d_sum', None, None)),
+        '融資融券變化': ('margin', '億', ('margin_5d_avg', 'margin_5d_sum', 'margin_20d_avg', 'margin_20d_sum')),
+        '選擇權 P/C Ratio': ('pc_ratio', '%', ('pc_5d_avg', None, None, None)),
+        '外資期貨未平倉': ('futures', '口', ('futures_5d_avg', None, None, None)),
+    }
+    
+    def __init__(self, date_str: str, watchlist_path: str = 'data/config/watchlist.json', refresh: bool = False):
         self.date_str = date_str
         self.watchlist_path = watchlist_path
+        self.refresh = refresh  # True 時忽略本機資料快取
         self.single_day_data = {}
         self.history_data = {}
         self.stock_data = {}  # 個股籌碼資料
         self.warrant_data = {} # 權證資料
     
     def fetch_all_data(self):
-        """抓取所有數據（單日 + 歷史統計）"""
+        """抓取所有數據（單日 + 歷史統計 + 個股籌碼）"""
         print(f"[INFO] 開始抓取 {self.date_str} 的完整風險監控數據...\n")
         
-        # 1. 抓取單日數據
-        print("=" * 60)
-        print(" 第一階段：單日數據抓取")
-        print("=" * 60)
-        monitor = RiskMonitor(self.date_str)
-        monitor.fetch_all_data()
-        self.single_day_data = monitor.data
-        
-        # 2. 抓取歷史統計
-        print("\n" + "=" * 60)
-        print(" 第二階段：歷史統計計算")
-        print("=" * 60)
-        hist_fetcher = HistoricalDataFetcher(self.date_str)
+        if self.refresh:
+            # --refresh：本次執行忽略既有的網頁、yfinance 與逐日歷史快取（個股快取由 StockMonitor 處理）
+            disk_cache.bypass_reads('http', 'http_validators', 'yfinance_history',
+                                    'history_institutional', 'history_margin', 'history_futures')
         
-        # 三大法人歷史（20日）
-        inst_hist = hist_fetcher.fetch_institutional_history(20)
+        RiskMonitor, HistoricalDataFetcher, StockMonitor = _import_monitors()
+        monitor = RiskMonitor(self.date_str)
         
-        # 融資融券歷史（20日）
-        margin_hist = hist_fetcher.fetch_margin_history(20)
+        def fetch_history(sections):
+            """
+            依序抓取同一主機的歷史統計：同主機請求本就由共用節流器排隊，依序執行不會變慢，
+            且每次只有一組 _fetch_days 執行緒在途；個別區塊失敗只讓該區塊留空
+            """
+            history = {}
+            with HistoricalDataFetcher(self.date_str) as hist_fetcher:
+                for key, method_name, num_days in sections:
+                    try:
+                        history[key] = getattr(hist_fetcher, method_name)(num_days) or {}
+                    except Exception as e:
+                        print(f"[WARNING] {key} 抓取失敗: {e}")
+                        history[key] = {}
+            return history
+        
+        def fetch_stocks():
+            # 建立 StockMonitor 也在錯誤處理範圍內，個股區塊失敗不影響其他數據
+            stock_monitor = StockMonitor(self.date_str, self.watchlist_path, refresh=self.refresh)
+            stock_monitor.load_watchlist()
+            stock_monitor.fetch_all_data()
+            return stock_monitor.stock_data, stock_monitor.warrant_data
         
-        # P/C Ratio 歷史（5日）
-        pc_hist = hist_fetcher.fetch_pc_ratio_history(5)
+        # 歷史統計只依賴交易日，已結算日期的結果不會再變，直接沿用快取
+        cached_history = None if self.refresh else disk_cache.load('risk_history', self.date_str, self.date_str)
         
-        # 期貨歷史（5日）
-        futures_hist = hist_fetcher.fetch_futures_history(5)
+        # 單日數據、歷史統計與個股籌碼彼此獨立，皆為等待網路回應的 I/O，以執行緒併發抓取。
+        # 歷史統計依主機分為證交所（三大法人/融資 20 日）與期交所（P/C Ratio/期貨 5 日）兩組，
+        # 外層只開 4 個執行緒，避免與各 fetcher 內部的執行緒池層層相乘
+        print("=" * 60)
+        print(" 併發抓取：單日數據 / 歷史統計 / 個股籌碼")
+        print("=" * 60)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            single_day_future = executor.submit(monitor.fetch_all_data, verbose=False)
+            history_futures = []
+            if cached_history is None:
+                history_futures = [
+                    executor.submit(fetch_history, (('institutional', 'fetch_institutional_history', 20),
+                                                    ('margin', 'fetch_margin_history', 20))),
+                    executor.submit(fetch_history, (('pc_ratio', 'fetch_pc_ratio_history', 5),
+                                                    ('futures', 'fetch_futures_history', 5))),
+                ]
+            else:
+                print(f"[INFO] 使用 {self.date_str} 歷史統計快取（--refresh 可強制重抓）")
+            stock_future = executor.submit(fetch_stocks)
+        
+        # 單日數據是報告主體：抓取失敗時直接拋出，由 main() 以 exit 1 結束，不輸出空白報表
+        single_day_future.result()
+        self.single_day_data = monitor.data
         
-        self.history_data = {
-            'institutional': inst_hist,
-            'margin': margin_hist,
-            'pc_ratio': pc_hist,
-            'futures': futures_hist
-        }
+        if cached_history is not None:
+            self.history_data = cached_history
+        else:
+            self.history_data = {key: {} for key in HISTORY_SECTIONS}
+            for future in history_futures:
+                try:
+                    self.history_data.update(future.result())
+                except Exception as e:
+                    print(f"[WARNING] 歷史統計抓取失敗: {e}")
+            # 只快取完整結果，避免把暫時性的抓取失敗固定下來
+            if self._history_complete(self.history_data):
+                disk_cache.store('risk_history', self.date_str, self.history_data)
         
-        # 3. 抓取個股籌碼資料
-        print("\n" + "=" * 60)
-        print(" 第三階段：個股籌碼監控")
-        print("=" * 60)
         try:
-            stock_monitor = StockMonitor(self.date_str, self.watchlist_path)
-            stock_monitor.load_watchlist()
-            stock_monitor.fetch_all_data()
-            self.stock_data = stock_monitor.stock_data
-            self.warrant_data = stock_monitor.warrant_data
+            self.stock_data, self.warrant_data = stock_future.result()
         except Exception as e:
             print(f"[WARNING] 個股籌碼抓取失敗: {e}")
             self.stock_data = {}
@@ -91,10 +202,20 @@ class IntegratedRiskReport:
         
         print("\n[SUCCESS] 所有數據抓取完成！\n")
     
+    @staticmethod
+    def _history_complete(history_data: dict) -> bool:
+        """所有歷史統計區塊都有值時才視為完整"""
+        return all(
+            history_data.get(key) and all(v is not None for v in history_data[key].values())
+            for key in HISTORY_SECTIONS
+        )
+    
     def export_to_excel(self, filename: str = 'risk_report.xlsx'):
         """匯出到 Excel 檔案"""
         print(f"[INFO] 正在生成 Excel 報表...")
         
+        from openpyxl import Workbook
+        
         wb = Workbook()
         
         # 刪除預設工作表
@@ -129,6 +250,20 @@ class IntegratedRiskReport:
         wb.save(output_path)
         print(f"[SUCCESS] Excel 報表已儲存至: {output_path}\n")
     
+    @staticmethod
+    def _format_stat(value, unit: str) -> str:
+        """歷史統計數值加上單位；缺值直接顯示 '-'，不附單位"""
+        return '-' if value is None else f"{value}{unit}"
+    
+    def _write_header_row(self, ws, headers, font, fill):
+        """於第 3 列寫入置中表頭"""
+        styles = _styles()
+        for col, header in enumerate(headers, start=1):
+            cell = ws.cell(row=3, column=col, value=header)
+            cell.fill = fill
+            cell.font = font
+            cell.alignment = styles.center_alignment
+    
     def _load_5d_market_stats(self) -> dict:
         """從 outputs/json/ 讀取前 5 個交易日的 總覽 數值，計算 5 日均值供大盤指標使用。"""
         json_dir = os.path.join('outputs', 'json')
@@ -166,25 +301,33 @@ class IntegratedRiskReport:
 
     def _create_summary_sheet(self, ws):
         """創建總覽工作表"""
+        from openpyxl.utils import get_column_letter
+        styles = _styles()
+        
         # 標題
         ws['A1'] = f"台灣股市風險監控報告 - {self.date_str}"
-        ws['A1'].font = Font(size=16, bold=True)
+        ws['A1'].font = styles.title_font
         ws.merge_cells('A1:H1')
-        ws['A1'].alignment = Alignment(horizontal='center')
+        ws['A1'].alignment = styles.center_alignment
         
         # 設定表頭
         headers = ['類別', '指標', '當日數值', '單日變動', '5日平均', '5日總和', '20日平均', '20日總和']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center')
+        self._write_header_row(ws, headers, styles.bold_font, styles.grey_fill)
+        
+        # 填入數據：先組好所有資料列，再自第 4 列起以 ws.append 連續寫入
+        for row_values in self._build_summary_rows():
+            ws.append(row_values)
         
+        # 調整欄寬
+        for col in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 18
+    
+    def _build_summary_rows(self) -> list:
+        """組出總覽表資料列：類別、指標、當日數值、單日變動、5日平均/總和、20日平均/總和"""
         # 大盤指標 5 日均值（從既存 JSON 讀取，零 API 成本）
         market_5d = self._load_5d_market_stats()
-
-        # 填入數據
-        row = 4
+        
+        rows = []
         for indicator in self.single_day_data.get('indicators', []):
             name = indicator['name']
             value = indicator['value']
@@ -195,111 +338,76 @@ class IntegratedRiskReport:
             value_str = f"{value}{unit}" if value is not None else "N/A"
             change_str = f"{change:+.2f}%" if change is not None else ""
 
-            # 歷史統計（根據指標類型）
-            stats_5d_avg, stats_5d_sum, stats_20d_avg, stats_20d_sum = "", "", "", ""
-
-            if name == '外資現貨':
-                stats_5d_avg = f"{self.history_data['institutional'].get('foreign_5d_avg', '-')}億"
-                stats_5d_sum = f"{self.history_data['institutional'].get('foreign_5d_sum', '-')}億"
-                stats_20d_avg = f"{self.history_data['institutional'].get('foreign_20d_avg', '-')}億"
-                stats_20d_sum = f"{self.history_data['institutional'].get('foreign_20d_sum', '-')}億"
-            elif name == '投信現貨':
-                stats_5d_avg = f"{self.history_data['institutional'].get('trust_5d_avg', '-')}億"
-                stats_5d_sum = f"{self.history_data['institutional'].get('trust_5d_sum', '-')}億"
-            elif name == '融資融券變化':
-                stats_5d_avg = f"{self.history_data['margin'].get('margin_5d_avg', '-')}億"
-                stats_5d_sum = f"{self.history_data['margin'].get('margin_5d_sum', '-')}億"
-                stats_20d_avg = f"{self.history_data['margin'].get('margin_20d_avg', '-')}億"
-                stats_20d_sum = f"{self.history_data['margin'].get('margin_20d_sum', '-')}億"
-            elif name == '選擇權 P/C Ratio':
-                stats_5d_avg = f"{self.history_data['pc_ratio'].get('pc_5d_avg', '-')}%"
-            elif name == '外資期貨未平倉':
-                stats_5d_avg = f"{self.history_data['futures'].get('futures_5d_avg', '-')}口"
+            # 歷史統計（依指標查表：5日平均/5日總和/20日平均/20日總和）
+            stats = ["", "", "", ""]
+            if name in self.SUMMARY_HISTORY_STATS:
+                section_name, stats_unit, keys = self.SUMMARY_HISTORY_STATS[name]
+                section = self.history_data.get(section_name, {})
+                stats = [self._format_stat(section.get(key), stats_unit) if key else "" for key in keys]
             elif name in market_5d:
                 # 大盤技術指標：5 日均值（均價類型，加回單位字串）
                 avg_val = market_5d[name]
-                stats_5d_avg = f"{avg_val}{unit}" if unit else str(avg_val)
-            
-            # 寫入行
-            ws.cell(row, 1, indicator['category'])
-            ws.cell(row, 2, name)
-            ws.cell(row, 3, value_str)
-            ws.cell(row, 4, change_str)
-            ws.cell(row, 5, stats_5d_avg)
-            ws.cell(row, 6, stats_5d_sum)
-            ws.cell(row, 7, stats_20d_avg)
-            ws.cell(row, 8, stats_20d_sum)
+                stats[0] = f"{avg_val}{unit}" if unit else str(avg_val)
             
-            row += 1
-        
-        # 調整欄寬
-        for col in range(1, 9):
-            ws.column_dimensions[get_column_letter(col)].width = 18
+            rows.append([indicator['category'], name, value_str, change_str, *stats])
+        return rows
     
     def _create_detail_sheet(self, ws):
         """創建詳細數據工作表"""
+        styles = _styles()
         ws['A1'] = "詳細歷史統計數據"
-        ws['A1'].font = Font(size=14, bold=True)
+        ws['A1'].font = styles.subtitle_font
         
-        # 三大法人區塊
+        # 三大法人區塊（各區塊標題後的資料列以 ws.append 接續寫入）
         row = 3
         ws[f'A{row}'] = "三大法人買賣超（過去20日）"
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
+        ws[f'A{row}'].font = styles.bold_font
         
         inst = self.history_data.get('institutional', {})
         data_rows = [
-            ['外資 5日平均', f"{inst.get('foreign_5d_avg', '-')}億"],
-            ['外資 5日總和', f"{inst.get('foreign_5d_sum', '-')}億"],
-            ['外資 20日平均', f"{inst.get('foreign_20d_avg', '-')}億"],
-            ['外資 20日總和', f"{inst.get('foreign_20d_sum', '-')}億"],
+            ['外資 5日平均', self._format_stat(inst.get('foreign_5d_avg'), '億')],
+            ['外資 5日總和', self._format_stat(inst.get('foreign_5d_sum'), '億')],
+            ['外資 20日平均', self._format_stat(inst.get('foreign_20d_avg'), '億')],
+            ['外資 20日總和', self._format_stat(inst.get('foreign_20d_sum'), '億')],
             ['', ''],
-            ['投信 5日平均', f"{inst.get('trust_5d_avg', '-')}億"],
-            ['投信 5日總和', f"{inst.get('trust_5d_sum', '-')}億"],
+            ['投信 5日平均', self._format_stat(inst.get('trust_5d_avg'), '億')],
+            ['投信 5日總和', self._format_stat(inst.get('trust_5d_sum'), '億')],
         ]
         
         for data_row in data_rows:
-            ws.cell(row, 1, data_row[0])
-            ws.cell(row, 2, data_row[1])
-            row += 1
+            ws.append(data_row)
         
         # 融資融券區塊
-        row += 2
+        row = ws.max_row + 3
         ws[f'A{row}'] = "融資融券變化（過去20日）"
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
+        ws[f'A{row}'].font = styles.bold_font
         
         margin = self.history_data.get('margin', {})
         margin_rows = [
-            ['5日平均', f"{margin.get('margin_5d_avg', '-')}億"],
-            ['5日總和', f"{margin.get('margin_5d_sum', '-')}億"],
-            ['20日平均', f"{margin.get('margin_20d_avg', '-')}億"],
-            ['20日總和', f"{margin.get('margin_20d_sum', '-')}億"],
+            ['5日平均', self._format_stat(margin.get('margin_5d_avg'), '億')],
+            ['5日總和', self._format_stat(margin.get('margin_5d_sum'), '億')],
+            ['20日平均', self._format_stat(margin.get('margin_20d_avg'), '億')],
+            ['20日總和', self._format_stat(margin.get('margin_20d_sum'), '億')],
         ]
         
         for data_row in margin_rows:
-            ws.cell(row, 1, data_row[0])
-            ws.cell(row, 2, data_row[1])
-            row += 1
+            ws.append(data_row)
         
         # 期貨與選擇權區塊
-        row += 2
+        row = ws.max_row + 3
         ws[f'A{row}'] = "期貨與選擇權（過去5日）"
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
+        ws[f'A{row}'].font = styles.bold_font
         
         pc = self.history_data.get('pc_ratio', {})
         futures = self.history_data.get('futures', {})
         
         futures_rows = [
-            ['P/C Ratio 5日平均', f"{pc.get('pc_5d_avg', '-')}%"],
-            ['外資期貨淨部位 5日平均', f"{futures.get('futures_5d_avg', '-')}口"],
+            ['P/C Ratio 5日平均', self._format_stat(pc.get('pc_5d_avg'), '%')],
+            ['外資期貨淨部位 5日平均', self._format_stat(futures.get('futures_5d_avg'), '口')],
         ]
         
         for data_row in futures_rows:
-            ws.cell(row, 1, data_row[0])
-            ws.cell(row, 2, data_row[1])
-            row += 1
+            ws.append(data_row)
         
         # 調整欄寬
         ws.column_dimensions['A'].width = 30
@@ -307,11 +415,14 @@ class IntegratedRiskReport:
     
     def _create_stock_sheet(self, ws):
         """創建個股籌碼監控工作表"""
+        from openpyxl.utils import get_column_letter
+        styles = _styles()
+        
         # 標題
         ws['A1'] = f"個股籌碼監控報告 - {self.date_str}"
-        ws['A1'].font = Font(size=16, bold=True)
+        ws['A1'].font = styles.title_font
         ws.merge_cells('A1:O1')
-        ws['A1'].alignment = Alignment(horizontal='center')
+        ws['A1'].alignment = styles.center_alignment
         
         if not self.stock_data:
             ws['A3'] = "無個股籌碼資料（請確認 data/config/watchlist.json 存在）"
@@ -325,63 +436,21 @@ class IntegratedRiskReport:
             '買賣券商差', '籌碼集中度5D(%)', '借券賣出餘額', '短回補天數', 'VWAP20D', 'VWAP乖離(%)', '資料來源'
         ]
         
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
+        self._write_header_row(ws, headers, styles.white_bold_font, styles.blue_fill)
         
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-        
-        # 資料行
-        row = 4
-        for code, data in self.stock_data.items():
-            ws.cell(row, 1, data.get('code', ''))
-            ws.cell(row, 2, data.get('name', ''))
-            ws.cell(row, 3, data.get('market', ''))
-            ws.cell(row, 4, data.get('close'))
-            ws.cell(row, 5, data.get('pct_change'))
-            ws.cell(row, 6, data.get('volume'))
-            ws.cell(row, 7, data.get('foreign_daily'))
-            ws.cell(row, 8, data.get('foreign_5d_sum'))
-            ws.cell(row, 9, data.get('trust_daily'))
-            ws.cell(row, 10, data.get('trust_5d_sum'))
-            ws.cell(row, 11, data.get('dealer_daily'))
-            ws.cell(row, 12, data.get('margin_daily_change'))
-            ws.cell(row, 13, data.get('margin_5d_sum'))
-            ws.cell(row, 14, data.get('lending_daily_change'))
-            ws.cell(row, 15, data.get('dist_ma20'))
-            
-            # 進階籌碼指標
-            ws.cell(row, 16, data.get('broker_buy_sell_diff'))
-            ws.cell(row, 17, data.get('chip_concentration_5d'))
-            ws.cell(row, 18, data.get('sbl_sell_balance'))
-            ws.cell(row, 19, data.get('short_cover_days'))
-            ws.cell(row, 20, data.get('vwap_20d_approx'))
-            ws.cell(row, 21, data.get('vwap_bias'))
-            ws.cell(row, 22, data.get('data_source', 'N/A'))
-            
-            # 條件格式 - 外資買超綠色，賣超紅色
-            if data.get('foreign_daily') and data['foreign_daily'] > 0:
-                ws.cell(row, 7).font = Font(color="008000")
-            elif data.get('foreign_daily') and data['foreign_daily'] < 0:
-                ws.cell(row, 7).font = Font(color="FF0000")
-            
-            # 漲跌幅顏色
-            if data.get('pct_change') and data['pct_change'] > 0:
-                ws.cell(row, 5).font = Font(color="FF0000")
-            elif data.get('pct_change') and data['pct_change'] < 0:
-                ws.cell(row, 5).font = Font(color="008000")
-            
-            # 籌碼集中度顏色
-            if data.get('chip_concentration_5d'):
-                if data['chip_concentration_5d'] > 0:
-                    ws.cell(row, 17).font = Font(color="008000")
-                elif data['chip_concentration_5d'] < 0:
-                    ws.cell(row, 17).font = Font(color="FF0000")
+        # 資料行：整列組好後以 ws.append 一次寫入（表頭在第 3 列，資料自第 4 列起）
+        for data in self.stock_data.values():
+            ws.append([data.get(key, default) for key, default in self.STOCK_SHEET_FIELDS])
+            row = ws.max_row
             
-            row += 1
+            # 條件格式 - 外資買超綠色，賣超紅色；漲跌幅紅漲綠跌；籌碼集中度同外資
+            for col, font in (
+                (7, sign_font(data.get('foreign_daily'), styles.green_font, styles.red_font)),
+                (5, sign_font(data.get('pct_change'), styles.red_font, styles.green_font)),
+                (17, sign_font(data.get('chip_concentration_5d'), styles.green_font, styles.red_font)),
+            ):
+                if font is not None:
+                    ws.cell(row, col).font = font
         
         # 調整欄寬 (含進階指標欄位)
         col_widths = [10, 12, 10, 10, 10, 12, 14, 14, 14, 14, 14, 12, 12, 12, 12, 12, 14, 14, 12, 10, 12, 10]
@@ -390,11 +459,14 @@ class IntegratedRiskReport:
     
     def _create_warrant_sheet(self, ws):
         """創建權證監控工作表"""
+        from openpyxl.utils import get_column_letter
+        styles = _styles()
+        
         # 標題
         ws['A1'] = f"權證監控報告 - {self.date_str}"
-        ws['A1'].font = Font(size=16, bold=True)
+        ws['A1'].font = styles.title_font
         ws.merge_cells('A1:N1')
-        ws['A1'].alignment = Alignment(horizontal='center')
+        ws['A1'].alignment = styles.center_alignment
         
         if not self.warrant_data:
             ws['A3'] = "無權證資料（請確認 data/config/watchlist.json 是否有權證代碼）"
@@ -407,14 +479,7 @@ class IntegratedRiskReport:
             '實質槓桿', '成交價隱波%', '流通在外比例%'
         ]
         
-        header_fill = PatternFill(start_color="ED7D31", end_color="ED7D31", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
+        self._write_header_row(ws, headers, styles.white_bold_font, styles.orange_fill)
             
         # 資料行
         row = 4
@@ -435,12 +500,10 @@ class IntegratedRiskReport:
             ws.cell(row, 14, data.get('outstanding_pct') or 'N/A')
             
             # 漲跌幅顏色
-            if data.get('pct_change') and data['pct_change'] > 0:
-                ws.cell(row, 5).font = Font(color="FF0000")
-                ws.cell(row, 4).font = Font(color="FF0000")
-            elif data.get('pct_change') and data['pct_change'] < 0:
-                ws.cell(row, 5).font = Font(color="008000")
-                ws.cell(row, 4).font = Font(color="008000")
+            font = sign_font(data.get('pct_change'), styles.red_font, styles.green_font)
+            if font is not None:
+                ws.cell(row, 5).font = font
+                ws.cell(row, 4).font = font
                 
             row += 1
             
@@ -480,19 +543,25 @@ def main():
         help='Excel 輸出檔名（預設: risk_report.xlsx）'
     )
     
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='忽略本機資料快取，重新抓取單日數據、20 日/5 日歷史資料與個股資料'
+    )
+    
 
     
     args = parser.parse_args()
     
     # 取得交易日期
-    trading_date = get_trading_date(args.date)
+    trading_date = _resolve_trading_date(args.date)
     
     if args.date and args.date != trading_date:
         print(f"[INFO] 指定日期為週末，已調整為 {trading_date}\n")
     
     # 執行整合報告生成
     try:
-        report = IntegratedRiskReport(trading_date)
+        report = IntegratedRiskReport(trading_date, refresh=args.refresh)
         report.fetch_all_data()
         report.export_to_excel(args.output)
         
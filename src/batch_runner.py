@@ -70,13 +70,8 @@ def main():
     print(f"  > 目標天數: {args.days} 個交易日")
     print(f"  > 結束日期: {end_date_str}")
     
-    # 取得前 N 個交易日列表 (舊到新)
-    # 這裡將 buffer_days 設小一點即可，因為我們主要依賴 risk_monitor_history 幫我們找有開市的日子
-    trading_dates = get_previous_trading_days(end_date_str, args.days, buffer_days=15)
-    
-    # get_previous_trading_days 會給我們 target_date 往前推天數的 list
-    # 取最後的 args.days 筆就好，因為可能超過
-    trading_dates = trading_dates[-args.days:]
+    # 取得前 N 個交易日列表 (舊到新)；交易日曆已排除週末與休假日，不需額外緩衝
+    trading_dates = get_previous_trading_days(end_date_str, args.days)
 
     print(f"[INFO] 即將執行的日期列表 (共 {len(trading_dates)} 天):")
     for d in trading_dates:
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Small on-disk cache for market data keyed by trading date.
+
+Data for a trading date never changes once it has settled, so an entry that
+was written after that point is kept indefinitely. Anything written earlier
+(today's runs, or an intraday snapshot left over from a previous day) expires
+after a short TTL so reruns still pick up fresh numbers.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CACHE_ROOT = PROJECT_ROOT / "data" / "cache"
+TODAY_TTL_SECONDS = 300
+# Data for a date counts as settled once the following calendar day has begun
+SETTLE_DELAY = timedelta(days=1)
+
+_UNSAFE_KEY_CHARS = re.compile(r"[^0-9A-Za-z._-]+")
+_bypass_reads: dict = {}
+
+
+def cache_path(namespace: str, key: str, suffix: str = ".pkl") -> Path:
+    """Return the cache file for ``key`` under ``data/cache/<namespace>``."""
+    safe_key = _UNSAFE_KEY_CHARS.sub("_", key)
+    return CACHE_ROOT / namespace / f"{safe_key}{suffix}"
+
+
+def is_fresh(path: Path, date_str: str, today_ttl: float = TODAY_TTL_SECONDS,
+             settle_delay: timedelta = SETTLE_DELAY) -> bool:
+    """Entries written after ``date_str`` settled never expire; earlier ones honour ``today_ttl``."""
+    if not path.exists():
+        return False
+    mtime = path.stat().st_mtime
+    try:
+        settled_at = (datetime.strptime(date_str, "%Y%m%d") + settle_delay).timestamp()
+    except ValueError:
+        settled_at = float("inf")
+    if mtime >= settled_at:
+        return True
+    return time.time() - mtime < today_ttl
+
+
+def load(namespace: str, key: str, date_str: str, today_ttl: float = TODAY_TTL_SECONDS,
+         settle_delay: timedelta = SETTLE_DELAY) -> Optional[Any]:
+    """Return the cached object, or None when missing, stale, unreadable or bypassed."""
+    path = cache_path(namespace, key)
+    if not is_fresh(path, date_str, today_ttl, settle_delay):
+        return None
+    bypass_since = _bypass_reads.get(namespace)
+    if bypass_since is not None and path.stat().st_mtime < bypass_since:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def bypass_reads(*namespaces: str) -> None:
+    """Ignore entries written before now in ``namespaces`` for the rest of the process (``--refresh``).
+
+    Fresh data is still stored, and entries written after this call are served normally,
+    so one refreshed run does not refetch the same key twice.
+    """
+    now = time.time()
+    for namespace in namespaces:
+        _bypass_reads[namespace] = now
+
+
+def store(namespace: str, key: str, value: Any) -> None:
+    """Write ``value`` atomically so concurrent readers never see a partial file."""
+    path = cache_path(namespace, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARNING] 寫入快取失敗 ({path}): {e}")
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel 共用樣式工具
+main.py 整合報告與 stock_monitor 個股報表共用的條件格式判斷
+"""
+
+
+def sign_font(value, positive_font, negative_font):
+    """依數值正負選擇字型；None 或 0 不上色"""
+    if not value:
+        return None
+    return positive_font if value > 0 else negative_font if value < 0 else None
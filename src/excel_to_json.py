@@ -8,11 +8,22 @@ Excel 轉 JSON 工具
 import pandas as pd
 import json
 import argparse
+import hashlib
+import io
+import multiprocessing
 import os
+import sys
 import numpy as np
 import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson 為選用加速套件，未安裝時退回標準 json
+    orjson = None
+
 class NpEncoder(json.JSONEncoder):
     """處理 NumPy 數據類型的 JSON Encoder"""
     def default(self, obj):
@@ -31,6 +42,12 @@ class NpEncoder(json.JSONEncoder):
                 return None
         return super(NpEncoder, self).default(obj)
 
+def _orjson_default(obj):
+    """orjson 無法直接處理的型別 (日期) 與 NpEncoder 保持相同輸出格式"""
+    if isinstance(obj, (datetime, pd.Timestamp)):
+        return obj.strftime('%Y-%m-%d')
+    raise TypeError
+
 def sanitize_for_json(obj):
     """遞迴清理資料結構中的 NaN / Infinity，替換為 None (JSON null)"""
     if isinstance(obj, dict):
@@ -54,7 +71,7 @@ def convert_excel_to_json(input_path: str, output_path: str = None, indent: int
     
     if not os.path.exists(input_path):
         print(f"[ERROR] 找不到檔案: {input_path}")
-        return
+        return False
 
     print(f"[INFO] 正在讀取 Excel: {input_path}")
     
@@ -64,23 +81,26 @@ def convert_excel_to_json(input_path: str, output_path: str = None, indent: int
         
         # 判定是否為全球市場報表 (看工作表名稱)
         is_global = "Global Markets" in xls.sheet_names or "Macro Data" in xls.sheet_names
-        
+
+        # 預設讀取方式
+        # 台灣風險報表: 標題在第 3 行 (header=2)
+        # 全球市場報表: 標題在第 1 行 (header=0)
+        header_idx = 0 if is_global else 2
+
+        # 同一種 header 的工作表一次讀完，避免逐張呼叫 read_excel
+        table_sheets = [name for name in xls.sheet_names if name != "詳細數據"]
+        table_frames = pd.read_excel(xls, sheet_name=table_sheets, header=header_idx) if table_sheets else {}
+
         for sheet_name in xls.sheet_names:
             print(f"  處理工作表: {sheet_name}")
-            
-            # 預設讀取方式
-            # 台灣風險報表: 標題在第 3 行 (header=2)
-            # 全球市場報表: 標題在第 1 行 (header=0)
-            header_idx = 0 if is_global else 2
-            
+
             if sheet_name == "詳細數據":
                 df = pd.read_excel(xls, sheet_name=sheet_name, header=None)
-                sheet_data = df.where(pd.notnull(df), None).values.tolist()
+                sheet_data = np.where(df.notna().to_numpy(), df.to_numpy(dtype=object), None).tolist()
             else:
-                df = pd.read_excel(xls, sheet_name=sheet_name, header=header_idx)
+                df = table_frames[sheet_name]
                 df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
-                df = df.where(pd.notnull(df), None)
-                sheet_data = df.to_dict(orient='records')
+                sheet_data = df.astype(object).where(df.notna(), None).to_dict(orient='records')
             
             data[sheet_name] = sheet_data
 
@@ -102,20 +122,36 @@ def convert_excel_to_json(input_path: str, output_path: str = None, indent: int
         # 清理 NaN / Infinity 為 null
         data = sanitize_for_json(data)
 
-        # 寫入 JSON
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, cls=NpEncoder, ensure_ascii=False, indent=indent)
+        # 寫入 JSON (orjson 僅支援 2 格縮排，其他縮排走標準 json)
+        # Excel 標題可能是數字 (如 2024)，需 OPT_NON_STR_KEYS 才能與標準 json 一樣轉成字串鍵；
+        # 其餘 orjson 不支援的鍵或值型別退回標準 json
+        payload = None
+        if orjson is not None and indent == 2:
+            options = (orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+                       | orjson.OPT_NON_STR_KEYS)
+            try:
+                payload = orjson.dumps(data, default=_orjson_default, option=options)
+            except TypeError:
+                payload = None
+        if payload is not None:
+            with open(output_path, 'wb') as f:
+                f.write(payload)
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, cls=NpEncoder, ensure_ascii=False, indent=indent)
             
         print(f"[SUCCESS] 轉換完成！已儲存至: {output_path}")
         
         # 轉換為 TXT
         # 傳遞 is_global 讓 TXT 知道如何處理輸出目錄
         convert_json_to_txt(output_path, is_global=is_global)
+        return True
         
     except Exception as e:
         print(f"[ERROR] 轉換失敗: {e}")
         import traceback
         traceback.print_exc()
+        return False
 
 def convert_json_to_txt(json_path: str, output_path: str = None, is_global: bool = False):
     """
@@ -178,6 +214,58 @@ def convert_json_to_txt(json_path: str, output_path: str = None, is_global: bool
         print(f"[ERROR] TXT 轉換失敗: {e}")
 
 
+def _file_hash(path: str) -> str:
+    """計算檔案內容的 BLAKE2b 雜湊 (分塊讀取，避免大檔一次載入記憶體)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _convert_captured(input_path: str, output_path: str):
+    """
+    於子程序中轉換單一檔案，進度與錯誤訊息先收集起來，回傳 (是否成功, 輸出文字) 交由主程序依序印出，
+    避免多個程序的輸出交錯
+    """
+    buffer = io.StringIO()
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        ok = convert_excel_to_json(input_path, output_path)
+    return ok, buffer.getvalue()
+
+def _can_use_processes() -> bool:
+    """
+    fork 啟動的子程序不重新匯入 __main__，一律安全；spawn/forkserver（Windows 預設）會重新匯入 __main__，
+    只有由本檔 CLI 執行（有 __main__ 保護）時才使用多程序，被其他程式匯入呼叫時改為逐一轉換
+    """
+    if multiprocessing.get_start_method() == 'fork':
+        return True
+    main_file = getattr(sys.modules.get('__main__'), '__file__', None)
+    return main_file is not None and os.path.abspath(main_file) == os.path.abspath(__file__)
+
+# Excel 內容雜湊清單存放於 data/cache/excel_to_json，不放進前端讀取的 outputs/ 資料夾
+HASH_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'cache', 'excel_to_json', 'manifest.json')
+
+def _load_hash_manifest() -> dict:
+    """讀取雜湊清單：{JSON 絕對路徑: {'mtime': Excel 修改時間, 'hash': Excel 內容雜湊}}"""
+    try:
+        with open(HASH_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_hash_manifest(manifest: dict):
+    """先寫暫存檔再取代，避免中斷時留下半份清單"""
+    path = HASH_MANIFEST_PATH
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARNING] 寫入雜湊清單失敗 ({path}): {e}")
+
 def batch_convert(input_dir: str = os.path.join('outputs', 'monitor_xlsx'), output_dir: str = os.path.join('outputs', 'json'), force: bool = False, is_global: bool = False):
     """
     批量轉換資料夾內所有 Excel 檔案
@@ -201,17 +289,33 @@ def batch_convert(input_dir: str = os.path.join('outputs', 'monitor_xlsx'), outp
     skipped_count = 0
     
     txt_sub_dir = 'global_txt' if is_global else 'txt'
+    manifest = _load_hash_manifest()
+    manifest_changed = False
+    pending_inputs = []
+    pending_outputs = []
+    pending_entries = []
     
     for xlsx_file in sorted(xlsx_files):
         input_path = os.path.join(input_dir, xlsx_file)
         base_name = os.path.splitext(xlsx_file)[0]
         output_path = os.path.join(output_dir, f"{base_name}.json")
+        manifest_key = os.path.abspath(output_path)
+        xlsx_mtime = os.path.getmtime(input_path)
+        entry = None
         
         if os.path.exists(output_path) and not force:
-            xlsx_mtime = os.path.getmtime(input_path)
             json_mtime = os.path.getmtime(output_path)
+            stored = manifest.get(manifest_key) or {}
+            up_to_date = xlsx_mtime <= json_mtime or stored.get('mtime') == xlsx_mtime
+            if not up_to_date:
+                # 只有修改時間判定過期時才計算雜湊：內容相同代表 Excel 只是被 touch (rsync / git checkout)，不必重新解析
+                entry = {'mtime': xlsx_mtime, 'hash': _file_hash(input_path)}
+                if stored.get('hash') == entry['hash']:
+                    manifest[manifest_key] = entry
+                    manifest_changed = True
+                    up_to_date = True
             
-            if xlsx_mtime <= json_mtime:
+            if up_to_date:
                 txt_path = os.path.join('outputs', txt_sub_dir, f"{base_name}.txt")
                 if os.path.exists(txt_path):
                     txt_mtime = os.path.getmtime(txt_path)
@@ -225,8 +329,33 @@ def batch_convert(input_dir: str = os.path.join('outputs', 'monitor_xlsx'), outp
                 converted_count += 1
                 continue
         
-        convert_excel_to_json(input_path, output_path)
-        converted_count += 1
+        pending_inputs.append(input_path)
+        pending_outputs.append(output_path)
+        pending_entries.append(entry or {'mtime': xlsx_mtime, 'hash': _file_hash(input_path)})
+    
+    # Excel 解析為 CPU-bound，跳過判斷留在主程序，有多個待轉檔案且可安全啟動子程序時才分派給多個 process
+    if pending_inputs:
+        max_workers = min(len(pending_inputs), os.cpu_count() or 1)
+        if max_workers > 1 and _can_use_processes():
+            results = []
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                # 依原順序逐檔印出子程序收集的訊息
+                for ok, output in executor.map(_convert_captured, pending_inputs, pending_outputs):
+                    print(output, end='')
+                    results.append(ok)
+        else:
+            results = [
+                convert_excel_to_json(input_path, output_path)
+                for input_path, output_path in zip(pending_inputs, pending_outputs)
+            ]
+        for output_path, entry, ok in zip(pending_outputs, pending_entries, results):
+            if ok:
+                manifest[os.path.abspath(output_path)] = entry
+                manifest_changed = True
+        converted_count += len(pending_inputs)
+    
+    if manifest_changed:
+        _save_hash_manifest(manifest)
     
     print()
     print(f"[SUMMARY] 轉換完成: {converted_count} 個, 跳過: {skipped_count} 個")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 共用工具
+TWSE / TPEx / TAIFEX 抓取模組共用的 JSON 解碼與請求節流
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用加速套件，未安裝時退回標準 json
+    orjson = None
+
+
+def response_json(response: requests.Response) -> Any:
+    """解析 TWSE/TPEx JSON 回應；有 orjson 時直接解碼原始位元組，省去 requests 先解碼成字串再交給標準 json"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+class RateLimiter:
+    """跨執行緒共用的請求節流：相鄰兩次請求的發出時間至少間隔 min_interval 秒"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# 各主機共用的節流器：risk_monitor、risk_monitor_history、stock_monitor 在同一行程內
+# 併發抓取時共用同一組間隔，整個行程對同一主機的請求頻率不超過原本逐筆抓取的間隔
+HOST_LIMITERS = {
+    'www.twse.com.tw': RateLimiter(1.5),
+    'www.tpex.org.tw': RateLimiter(1.0),
+    'www.taifex.com.tw': RateLimiter(1.5),
+}
+
+
+def wait_for_host(url: str):
+    """依 url 的主機套用共用節流；未列於 HOST_LIMITERS 的主機不等待"""
+    limiter = HOST_LIMITERS.get(urlsplit(url).hostname)
+    if limiter is not None:
+        limiter.wait()
+
+
+# 暫時性錯誤：限流 (429) 與伺服器端 5xx，重試後通常即可成功
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def retry_after_seconds(response: requests.Response, default: float) -> float:
+    """回應的 Retry-After（秒數或 HTTP 日期）換算為等待秒數；缺少或無法解析時使用 default"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def paced_get(session: requests.Session, url: str, retries: int = 3, backoff: float = 0.5,
+              **kwargs) -> requests.Response:
+    """
+    經主機節流發出 GET；遇 429/5xx 以退避重試，每次重試同樣經過節流，429 依 Retry-After 等待
+    重試用盡時回傳最後的回應，由呼叫端照常以 raise_for_status 判斷
+    """
+    for attempt in range(retries + 1):
+        wait_for_host(url)
+        response = session.get(url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        time.sleep(retry_after_seconds(response, backoff * 2 ** attempt))
@@ -5,16 +5,134 @@
 抓取多項金融指標，用於評估市場風險狀況
 """
 
+import bisect
+import re
 import requests
-import pandas as pd
-import yfinance as yf
+from requests.adapters import HTTPAdapter
+# pandas / yfinance 載入耗時，只在實際抓取 TAIFEX 表格或 Yahoo Finance 時才於函式內匯入，
+# 讓 get_trading_date 等工具函式與 --help 不必負擔其匯入成本
 from datetime import datetime, timedelta
 from tabulate import tabulate
 import argparse
 import json
 from io import StringIO
 import sys
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import disk_cache
+    from .http_utils import wait_for_host
+except ImportError:
+    import disk_cache
+    from http_utils import wait_for_host
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用加速套件，未安裝時退回標準 json
+    orjson = None
+
+# TWSE / TAIFEX 請求共用連線池，併發抓取時可重用 TCP/TLS 連線
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=8))
+# 與 stock_monitor 權證爬蟲一致使用瀏覽器 User-Agent；Accept-Encoding 沿用 requests 預設（已含 gzip/deflate）
+HTTP_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+})
+
+
+def _parse_yyyymmdd(date_str: str) -> datetime:
+    """解析固定 8 碼 YYYYMMDD 日期字串，直接切片轉整數，免去 strptime 的格式解析"""
+    if len(date_str) != 8 or not date_str.isdigit():
+        raise ValueError(f"日期格式錯誤，應為 YYYYMMDD: {date_str!r}")
+    return datetime(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:]))
+
+
+def _cached_get_text(url: str, params: Dict[str, str], date_str: str,
+                     is_complete: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    GET 並回傳回應內容，以 URL + 參數快取於 data/cache/http
+    （已結算日期的回應不會再變，永久沿用；當日資料依 disk_cache TTL 過期）
+    
+    伺服器若提供 ETag / Last-Modified，一併記錄於 data/cache/http_validators；
+    當日快取過期後改發條件式請求，回 304 時沿用舊內容並重新起算 TTL，不必重新下載
+    Args:
+        is_complete: 判斷回應是否為有效資料，未通過者不寫入快取，避免固定暫時性錯誤
+    """
+    key = f"{url}?{urlencode(sorted(params.items()))}"
+    text = disk_cache.load('http', key, date_str)
+    if text is not None:
+        return text
+    
+    headers = {}
+    stale_text = None
+    validators = disk_cache.load('http_validators', key, date_str, today_ttl=float('inf'))
+    if validators:
+        stale_text = disk_cache.load('http', key, date_str, today_ttl=float('inf'))
+    if stale_text is not None:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    
+    wait_for_host(url)
+    response = HTTP_SESSION.get(url, params=params, headers=headers, timeout=10)
+    if response.status_code == 304 and stale_text is not None:
+        disk_cache.store('http', key, stale_text)
+        return stale_text
+    response.raise_for_status()
+    if response.encoding is None:
+        response.encoding = 'utf-8'  # JSON 未宣告 charset 時依 RFC 8259 以 UTF-8 解碼
+    text = response.text
+    if is_complete is None or is_complete(text):
+        disk_cache.store('http', key, text)
+        validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+        if any(validators.values()):
+            disk_cache.store('http_validators', key, validators)
+    return text
+
+
+def _twse_stat_ok(text: str) -> bool:
+    try:
+        return json.loads(text).get('stat') == 'OK'
+    except ValueError:
+        return False
+
+
+def _has_table_matching(match: str) -> Callable[[str], bool]:
+    """
+    產生快取完整性檢查：頁面需含內容符合 match 正規式的 <table>（與 read_html 的 match 相同），
+    僅含版面表格的錯誤頁或「查無資料」頁不會寫入快取
+    """
+    pattern = re.compile(match)
+    
+    def is_complete(text: str) -> bool:
+        if '<table' not in text.lower():
+            return False
+        import lxml.html
+        try:
+            doc = lxml.html.fromstring(text)
+        except Exception:  # 空白或非 HTML 內容
+            return False
+        return any(pattern.search(table.text_content()) for table in doc.iter('table'))
+    
+    return is_complete
+
+
+def _has_table_cell(value: str) -> Callable[[str], bool]:
+    """產生快取完整性檢查：頁面需有 <table> 的儲存格文字恰為 value（如契約代號 TX，不含 MTX、ZTX）"""
+    def is_complete(text: str) -> bool:
+        if '<table' not in text.lower():
+            return False
+        import lxml.html
+        try:
+            doc = lxml.html.fromstring(text)
+        except Exception:  # 空白或非 HTML 內容
+            return False
+        return any(cell.text_content().strip() == value for cell in doc.xpath('//table//td'))
+    
+    return is_complete
 
 
 class TWSEFetcher:
@@ -50,9 +168,7 @@ class TWSEFetcher:
                 'type': 'day'
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = json.loads(_cached_get_text(url, params, self.date_str, _twse_stat_ok))
             
             if data['stat'] != 'OK':
                 raise ValueError(f"TWSE API返回錯誤: {data.get('stat')}")
@@ -118,9 +234,7 @@ class TWSEFetcher:
                 'selectType': 'ALL'
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = json.loads(_cached_get_text(url, params, self.date_str, _twse_stat_ok))
             
             if data['stat'] != 'OK':
                 raise ValueError(f"融資融券API返回錯誤: {data.get('stat')}")
@@ -179,13 +293,15 @@ class TAIFEXFetcher:
                 'queryDate': self.formatted_date,
                 'commodity_id': 'TX'
             }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            tables = pd.read_html(StringIO(response.text))
-            if tables:
-                df = tables[0]
-                # 第一行即為近月合約
-                row = df.iloc[0]
+            html = _cached_get_text(url, params, self.date_str, _has_table_cell('TX'))
+            import pandas as pd
+            # match 僅先篩掉不含 TX 字樣的表格；契約欄須恰為 TX，排除 MTX、ZTX 等其他契約列
+            tables = pd.read_html(StringIO(html), match='TX')
+            tx_rows = [table[table.iloc[:, 0].astype(str).str.strip() == 'TX'] for table in tables]
+            tx_rows = [rows for rows in tx_rows if not rows.empty]
+            if tx_rows:
+                # 第一個 TX 列即為近月合約
+                row = tx_rows[0].iloc[0]
                 settle = float(row.iloc[5])   # 最後成交價
                 # 漲跌% 為字串如 '▲1.37%' 或 '▼0.52%'
                 change_str = str(row.iloc[7]).replace('%', '').strip()
@@ -209,28 +325,32 @@ class TAIFEXFetcher:
                 'queryDate': self.formatted_date,  # 使用 YYYY/MM/DD 格式
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            # 只解析含 P/C Ratio 欄位的表格（match 讓 read_html 略過頁面上其餘表格，快取檢查亦同）
+            pc_column = '買賣權未平倉量比率%'
+            html = _cached_get_text(url, params, self.date_str, _has_table_matching(pc_column))
             
-            # 使用 pandas 解析 HTML 表格
-            tables = pd.read_html(StringIO(response.text))
+            import pandas as pd
+            try:
+                tables = pd.read_html(StringIO(html), match=pc_column, flavor='lxml')
+            except ValueError:  # 頁面沒有符合的表格（例如休市日）
+                return None
             
-            # 尋找包含 P/C Ratio 的表格
             for table in tables:
-                if '買賣權未平倉量比率%' in table.columns or '買賣權未平倉量比率%' in str(table.values):
-                    # 找到包含日期的行
-                    for idx, row in table.iterrows():
-                        if self.formatted_date in str(row.values):
-                            # P/C Ratio 通常在特定欄位
-                            pc_value = row['買賣權未平倉量比率%'] if '買賣權未平倉量比率%' in table.columns else None
-                            if pc_value:
-                                return float(str(pc_value).replace('%', '').replace(',', ''))
-                    
-                    # 如果沒有找到特定日期，取第一個數值
-                    if '買賣權未平倉量比率%' in table.columns:
-                        pc_value = table['買賣權未平倉量比率%'].iloc[0]
+                if pc_column not in table.columns:
+                    continue
+                
+                # 找到包含日期的行（整表向量化比對，取代逐列 iterrows）
+                date_mask = table.astype(str).apply(
+                    lambda col: col.str.contains(self.formatted_date, regex=False)
+                ).any(axis=1)
+                for pc_value in table.loc[date_mask, pc_column]:
+                    if pc_value:
                         return float(str(pc_value).replace('%', '').replace(',', ''))
                 
+                # 如果沒有找到特定日期，取第一個數值
+                pc_value = table[pc_column].iloc[0]
+                return float(str(pc_value).replace('%', '').replace(',', ''))
+                
         except Exception as e:
             print(f"[WARNING] 抓取選擇權 P/C Ratio 失敗: {e}")
             
@@ -251,11 +371,15 @@ class TAIFEXFetcher:
                 'queryDate': self.formatted_date,  # 使用 YYYY/MM/DD 格式
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            # 只解析含台指期列的表格（match 讓 read_html 略過頁面上其餘表格，快取檢查亦同）
+            futures_match = 'TX|臺股期貨|台股期货'
+            html = _cached_get_text(url, params, self.date_str, _has_table_matching(futures_match))
             
-            # 使用 pandas 解析 HTML 表格
-            tables = pd.read_html(StringIO(response.text))
+            import pandas as pd
+            try:
+                tables = pd.read_html(StringIO(html), match=futures_match, flavor='lxml')
+            except ValueError:  # 頁面沒有符合的表格（例如休市日）
+                tables = []
             
             # 尋找三大法人表格
             for table in tables:
@@ -263,14 +387,14 @@ class TAIFEXFetcher:
                 if len(table) < 2 or len(table.columns) < 5:
                     continue
                     
-                # 尋找 TX (台指期) 的數據
-                for idx, row in table.iterrows():
-                    row_str = ' '.join([str(v) for v in row.values])
+                # 尋找 TX (台指期) 的數據（itertuples 直接取值，免去 iterrows 每列建立 Series）
+                for values in table.itertuples(index=False, name=None):
+                    row_str = ' '.join([str(v) for v in values])
                     
                     # 檢查是否是 TX 的行
                     if 'TX' in row_str or '臺股期貨' in row_str or '台股期货' in row_str:
                         # 嘗試從各個欄位提取數值
-                        for col_idx, value in enumerate(row.values):
+                        for value in values:
                             try:
                                 # 清理數值字串
                                 value_str = str(value).replace(',', '').replace(' ', '').strip()
@@ -307,6 +431,8 @@ class YahooFinanceFetcher:
         'vix': '^VIX',         # 恐慌指數
         'wti': 'CL=F'          # WTI原油期貨
     }
+    # 美股收盤約為台灣時間隔日清晨，快取須於目標日隔天 06:00 後寫入才視為已結算的完整 K 棒
+    HISTORY_SETTLE_DELAY = timedelta(days=1, hours=6)
     
     def __init__(self, date_str: str):
         """
@@ -314,7 +440,7 @@ class YahooFinanceFetcher:
             date_str: 日期字串，格式 YYYYMMDD
         """
         self.date_str = date_str
-        self.target_date = datetime.strptime(date_str, '%Y%m%d')
+        self.target_date = _parse_yyyymmdd(date_str)
     
     def fetch_all(self) -> Dict[str, Any]:
         """
@@ -328,33 +454,35 @@ class YahooFinanceFetcher:
         """
         results = {}
         
+        # 抓取前後幾天的數據以確保有資料
+        start_date = self.target_date - timedelta(days=7)
+        end_date = self.target_date + timedelta(days=1)
+        histories = self._load_histories(start_date, end_date)
+        
         for key, symbol in self.SYMBOLS.items():
             try:
-                # 抓取前後幾天的數據以確保有資料
-                start_date = self.target_date - timedelta(days=7)
-                end_date = self.target_date + timedelta(days=1)
-                
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(start=start_date, end=end_date)
+                hist = histories.get(symbol)
+                if hist is None:
+                    # 批次下載未取得此代號時退回逐檔抓取
+                    hist = self._fetch_single_history(symbol, start_date, end_date)
                 
                 if hist.empty:
                     print(f"[WARNING] {symbol} 無數據")
                     results[key] = {'value': None, 'change_pct': None}
                     continue
                 
-                # 取最接近目標日期的數據
-                closest_date = min(hist.index, key=lambda x: abs(x.date() - self.target_date.date()))
-                latest_data = hist.loc[closest_date]
+                # 取最接近目標日期的數據（以日期差整批計算，同距離時取較早者，與逐筆 min 相同）
+                index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+                idx = int(abs((index.normalize() - self.target_date).days).argmin())
+                closes = hist['Close']
                 
-                value = round(latest_data['Close'], 2)
+                value = round(closes.iat[idx], 2)
                 
                 # 計算變化百分比（與前一天比較）
                 change_pct = None
-                if len(hist) >= 2:
-                    idx = hist.index.get_loc(closest_date)
-                    if idx > 0:
-                        prev_close = hist.iloc[idx - 1]['Close']
-                        change_pct = round(((value - prev_close) / prev_close) * 100, 2)
+                if idx > 0:
+                    prev_close = closes.iat[idx - 1]
+                    change_pct = round(((value - prev_close) / prev_close) * 100, 2)
                 
                 results[key] = {
                     'value': value,
@@ -366,11 +494,70 @@ class YahooFinanceFetcher:
                 results[key] = {'value': None, 'change_pct': None}
         
         return results
+    
+    def _load_histories(self, start_date: datetime, end_date: datetime) -> Dict[str, 'pd.DataFrame']:
+        """
+        讀取所有代號的歷史行情：先查 data/cache/yfinance_history，
+        未命中的代號以單次 yf.download 批次抓取，取代逐檔 Ticker.history 請求
+        """
+        histories = {}
+        missing = []
+        for symbol in self.SYMBOLS.values():
+            hist = disk_cache.load('yfinance_history', self._cache_key(symbol), self.date_str,
+                                   settle_delay=self.HISTORY_SETTLE_DELAY)
+            if hist is None:
+                missing.append(symbol)
+            else:
+                histories[symbol] = hist
+        
+        if not missing:
+            return histories
+        
+        import yfinance as yf
+        try:
+            batch = yf.download(
+                missing, start=start_date, end=end_date,
+                group_by='ticker', auto_adjust=True, threads=True, progress=False
+            )
+        except Exception as e:
+            print(f"[WARNING] yfinance 批次下載失敗，改為逐檔抓取: {e}")
+            return histories
+        
+        if batch is None or batch.empty:
+            return histories
+        
+        for symbol in missing:
+            try:
+                hist = batch[symbol].dropna(how='all')
+            except KeyError:
+                continue
+            if not hist.empty:
+                histories[symbol] = hist
+                disk_cache.store('yfinance_history', self._cache_key(symbol), hist)
+        return histories
+    
+    def _fetch_single_history(self, symbol: str, start_date: datetime, end_date: datetime) -> 'pd.DataFrame':
+        import yfinance as yf
+        hist = yf.Ticker(symbol).history(start=start_date, end=end_date)
+        if not hist.empty:
+            disk_cache.store('yfinance_history', self._cache_key(symbol), hist)
+        return hist
+    
+    def _cache_key(self, symbol: str) -> str:
+        """yfinance 歷史行情快取鍵：(symbol, 目標日)"""
+        return f"{symbol}_{self.date_str}"
 
 
 class RiskMonitor:
     """風險監控主類別"""
     
+    # 簡單的風險評估邏輯（可根據需求調整）：(遞增門檻, 對應等級)，value 小於門檻即落入該等級
+    RISK_RULES = {
+        'vix': ((20, 30, float('inf')), ('安全', '警戒', '危險')),
+        'foreign_net': ((0, 100, float('inf')), ('危險', '警戒', '安全')),
+        'total_net': ((-200, 0, float('inf')), ('危險', '警戒', '安全')),
+    }
+    
     def __init__(self, date_str: str):
         """
         Args:
@@ -379,29 +566,38 @@ class RiskMonitor:
         self.date_str = date_str
         self.data = {}
     
-    def fetch_all_data(self):
-        """抓取所有數據"""
-        print(f"[INFO] 開始抓取 {self.date_str} 的風險監控數據...\n")
+    def fetch_all_data(self, verbose: bool = True):
+        """
+        抓取所有數據
+        Args:
+            verbose: 是否輸出階段進度訊息；由外層統一顯示進度時（如 main.py 併發抓取）設為 False，
+                     避免多執行緒輸出交錯（警告訊息不受影響）
+        """
+        if verbose:
+            print(f"[INFO] 開始抓取 {self.date_str} 的風險監控數據...\n")
         
-        # 1. Yahoo Finance 國際指標
-        print("[1/3] 抓取國際金融指標...")
         yf_fetcher = YahooFinanceFetcher(self.date_str)
-        yf_data = yf_fetcher.fetch_all()
-        
-        # 2. 台灣證交所
-        print("[2/3] 抓取台灣證交所數據...")
         twse_fetcher = TWSEFetcher(self.date_str)
-        institutional = twse_fetcher.fetch_institutional_investors()
-        margin = twse_fetcher.fetch_margin_trading()
-        
-        # 3. 台灣期貨交易所
-        print("[3/3] 抓取台灣期貨交易所數據...")
         taifex_fetcher = TAIFEXFetcher(self.date_str)
-        pc_ratio = taifex_fetcher.fetch_options_pc_ratio()
-        futures = taifex_fetcher.fetch_futures_position()
         
-        # 4. 台指近月期貨
-        tx_near = taifex_fetcher.fetch_tx_settlement()
+        # Yahoo Finance / 證交所 / 期交所彼此獨立，皆為等待網路回應的 I/O，以執行緒併發抓取
+        # （各 fetch 方法內部已自行處理例外並回傳預設值）
+        if verbose:
+            print("[INFO] 併發抓取國際金融指標 / 台灣證交所 / 台灣期貨交易所數據...")
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            yf_future = executor.submit(yf_fetcher.fetch_all)
+            institutional_future = executor.submit(twse_fetcher.fetch_institutional_investors)
+            margin_future = executor.submit(twse_fetcher.fetch_margin_trading)
+            pc_ratio_future = executor.submit(taifex_fetcher.fetch_options_pc_ratio)
+            futures_future = executor.submit(taifex_fetcher.fetch_futures_position)
+            tx_near_future = executor.submit(taifex_fetcher.fetch_tx_settlement)
+        
+        yf_data = yf_future.result()
+        institutional = institutional_future.result()
+        margin = margin_future.result()
+        pc_ratio = pc_ratio_future.result()
+        futures = futures_future.result()
+        tx_near = tx_near_future.result()
         
         # 整合數據
         self.data = {
@@ -530,7 +726,8 @@ class RiskMonitor:
             ]
         }
         
-        print("\n[SUCCESS] 數據抓取完成！\n")
+        if verbose:
+            print("\n[SUCCESS] 數據抓取完成！\n")
     
     def _assess_risk(self, indicator: str, value: Optional[float]) -> str:
         """
@@ -541,17 +738,13 @@ class RiskMonitor:
         if value is None:
             return '無資料'
         
-        # 簡單的風險評估邏輯（可根據需求調整）
-        risk_rules = {
-            'vix': [(20, '安全'), (30, '警戒'), (float('inf'), '危險')],
-            'foreign_net': [(0, '危險'), (100, '警戒'), (float('inf'), '安全')],
-            'total_net': [(-200, '危險'), (0, '警戒'), (float('inf'), '安全')],
-        }
-        
-        if indicator in risk_rules:
-            for threshold, level in risk_rules[indicator]:
-                if value < threshold:
-                    return level
+        rule = self.RISK_RULES.get(indicator)
+        if rule is not None:
+            thresholds, levels = rule
+            # 第一個大於 value 的門檻即為所屬等級（等同逐一比對 value < threshold）
+            idx = bisect.bisect_right(thresholds, value)
+            if idx < len(levels):
+                return levels[idx]
         
         return '中性'
     
@@ -589,8 +782,20 @@ class RiskMonitor:
     
     def export_json(self, filename: str = 'risk_data.json'):
         """匯出為 JSON 檔案"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        payload = None
+        if orjson is not None:
+            # orjson 直接輸出 UTF-8（等同 ensure_ascii=False）；fetcher 以 round() 產生的
+            # numpy.float64 需 OPT_SERIALIZE_NUMPY，其他 orjson 不支援的型別退回標準 json
+            try:
+                payload = orjson.dumps(self.data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            except TypeError:
+                payload = None
+        if payload is not None:
+            with open(filename, 'wb') as f:
+                f.write(payload)
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
         print(f"[SAVED] 數據已儲存至 {filename}")
 
 
@@ -603,7 +808,7 @@ def get_trading_date(date_str: Optional[str] = None) -> str:
         交易日期字串 YYYYMMDD
     """
     if date_str:
-        target_date = datetime.strptime(date_str, '%Y%m%d')
+        target_date = _parse_yyyymmdd(date_str)
     else:
         target_date = datetime.now()
     
@@ -614,7 +819,7 @@ def get_trading_date(date_str: Optional[str] = None) -> str:
     elif weekday == 6:  # 週日
         target_date -= timedelta(days=2)
     
-    return target_date.strftime('%Y%m%d')
+    return f"{target_date.year:04d}{target_date.month:02d}{target_date.day:02d}"
 
 
 def main():
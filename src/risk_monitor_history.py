@@ -5,27 +5,88 @@
 提供多日數據抓取和統計分析功能
 """
 
+import re
 import requests
+from requests.adapters import HTTPAdapter
+import lxml.html
 import pandas as pd
-import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional
 
 
 try:
+    from . import disk_cache
+    from .http_utils import paced_get, response_json, wait_for_host
     from .trading_calendar import get_previous_trading_days
 except ImportError:
+    import disk_cache
+    from http_utils import paced_get, response_json, wait_for_host
     from trading_calendar import get_previous_trading_days
 
+# 數值儲存格清理：一次移除千分位逗號、空白與全形空白（TAIFEX 頁面偶有 \u3000）
+_NUMBER_CLEANUP = str.maketrans('', '', ', \t\u3000')
+# 期貨表格儲存格中的數值（千分位與空白已移除），如 -25123、1234.0
+_NUMBER_CELL_RE = re.compile(r'-?[0-9]+(?:\.[0-9]*)?')
+
+
 class HistoricalDataFetcher:
     """歷史數據抓取器"""
     
     TWSE_BASE_URL = "https://www.twse.com.tw"
     TAIFEX_BASE_URL = "https://www.taifex.com.tw"
+    MAX_CONCURRENT_REQUESTS = 4
+    # BFI82U 身分別 → 統計欄位；其餘身分別（自營商、外資自營商）不列入
+    INSTITUTION_KEYS = {'外資及陸資(不含外資自營商)': 'foreign', '投信': 'trust', '合計': 'total'}
     
     def __init__(self, date_str: str):
         self.date_str = date_str
+        # 同一主機的多日請求共用連線（keep-alive），免去每次重新建立 TCP/TLS；連線池大小配合併發數。
+        # 暫時性 429/5xx 錯誤由 http_utils.paced_get 重試（僅 GET），每次重送都經過主機節流
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.MAX_CONCURRENT_REQUESTS)
+        self._session.mount(self.TWSE_BASE_URL, adapter)
+        self._session.mount(self.TAIFEX_BASE_URL, adapter)
+    
+    def close(self):
+        """關閉共用連線"""
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _fetch_days(self, trading_days: List[str], fetch_one: Callable[[str], Any], label: str,
+                    cache_namespace: str) -> List[Any]:
+        """
+        併發抓取多個交易日，結果依 trading_days 順序回傳（失敗或無資料的日期為 None）
+        
+        原本逐日「請求 → 等待 1.5 秒」依序執行；改為同時最多 MAX_CONCURRENT_REQUESTS 個請求在途，
+        請求發出時間由 http_utils 的各主機共用節流器間隔（與 risk_monitor、stock_monitor 共用），
+        整個行程對同一主機的請求頻率不變，但網路延遲彼此重疊。
+        
+        每日解析後的數值快取於 data/cache/<cache_namespace>/<日期>：已收盤的日期資料不會再變，
+        快取永久有效（當日依 disk_cache TTL 過期），命中快取的日期不發請求也不佔用節流間隔
+        """
+        results = {date: disk_cache.load(cache_namespace, date, date) for date in trading_days}
+        pending = [date for date, value in results.items() if value is None]
+        
+        def task(date):
+            try:
+                value = fetch_one(date)
+            except Exception as e:
+                print(f"[WARNING] 抓取 {date} {label}失敗: {e}")
+                return None
+            if value is not None:
+                disk_cache.store(cache_namespace, date, value)
+            return value
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS) as executor:
+                results.update(zip(pending, executor.map(task, pending)))
+        return [results[date] for date in trading_days]
     
     def fetch_institutional_history(self, num_days: int = 20) -> Dict[str, Any]:
         """
@@ -41,34 +102,9 @@ class HistoricalDataFetcher:
         
         print(f"[INFO] 抓取過去 {num_days} 個交易日的三大法人數據（共嘗試 {len(trading_days)} 天）...")
         
-        for i, date in enumerate(trading_days):
-            try:
-                url = f"{self.TWSE_BASE_URL}/fund/BFI82U"
-                params = {'response': 'json', 'dayDate': date, 'type': 'day'}
-                
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data['stat'] == 'OK':
-                    for row in data.get('data', []):
-                        if len(row) >= 4:
-                            category = row[0]
-                            net_amount = float(row[3].replace(',', '')) / 100_000_000
-                            
-                            if '外資及陸資' in category and '不含' in category:
-                                history['foreign'].append(net_amount)
-                            elif category == '投信':
-                                history['trust'].append(net_amount)
-                            elif category == '合計':
-                                history['total'].append(net_amount)
-                
-                if i < len(trading_days) - 1:
-                    time.sleep(1.5)  # TWSE API 限制
-                    
-            except Exception as e:
-                print(f"[WARNING] 抓取 {date} 數據失敗: {e}")
-                continue
+        for day in self._fetch_days(trading_days, self._fetch_institutional_day, '數據', 'history_institutional'):
+            for key, value in (day or {}).items():
+                history[key].append(value)
         
         print(f"[INFO] 成功抓取 {len(history['foreign'])} 筆外資數據")
         return self._calculate_stats(history)
@@ -77,39 +113,16 @@ class HistoricalDataFetcher:
         """抓取多日融資融券數據並計算統計值"""
         # 使用真實交易日曆確保獲得精確天數
         trading_days = get_previous_trading_days(self.date_str, num_days)
-        margin_changes = []
         
         print(f"[INFO] 抓取過去 {num_days} 個交易日的融資融券數據（共嘗試 {len(trading_days)} 天）...")
         
-        for i, date in enumerate(trading_days):
-            try:
-                url = f"{self.TWSE_BASE_URL}/rwd/zh/marginTrading/MI_MARGN"
-                params = {'response': 'json', 'date': date, 'selectType': 'ALL'}
-                
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data['stat'] == 'OK' and len(data['tables'][0]['data']) > 2:
-                    margin_row = data['tables'][0]['data'][2]
-                    prev_balance = float(margin_row[1].replace(',', ''))
-                    today_balance = float(margin_row[2].replace(',', ''))
-                    margin_change = (today_balance - prev_balance) / 100_000
-                    margin_changes.append(margin_change)
-                
-                if i < len(trading_days) - 1:
-                    time.sleep(1.5)  # TWSE API 限制
-                    
-            except Exception as e:
-                print(f"[WARNING] 抓取 {date} 融資數據失敗: {e}")
-                continue
+        days = self._fetch_days(trading_days, self._fetch_margin_day, '融資數據', 'history_margin')
+        margin_changes = [change for change in days if change is not None]
         
         print(f"[INFO] 成功抓取 {len(margin_changes)} 筆融資數據")
         return {
-            'margin_5d_avg': self._calc_avg(margin_changes, 5),
-            'margin_5d_sum': self._calc_sum(margin_changes, 5),
-            'margin_20d_avg': self._calc_avg(margin_changes, 20),
-            'margin_20d_sum': self._calc_sum(margin_changes, 20),
+            **self._calc_window('margin', margin_changes, 5),
+            **self._calc_window('margin', margin_changes, 20),
         }
     
     def fetch_pc_ratio_history(self, num_days: int = 5) -> Dict[str, Any]:
@@ -124,7 +137,8 @@ class HistoricalDataFetcher:
             formatted_date = f"{self.date_str[:4]}/{self.date_str[4:6]}/{self.date_str[6:]}"
             params = {'queryDate': formatted_date}
             
-            response = requests.post(url, data=params, timeout=10)
+            wait_for_host(url)
+            response = self._session.post(url, data=params, timeout=10)
             response.raise_for_status()
             
             # 解析 CSV (忽略 header，手動處理行)
@@ -168,63 +182,116 @@ class HistoricalDataFetcher:
         """抓取多日外資期貨淨部位並計算統計值"""
         # 使用真實交易日曆確保獲得精確天數
         trading_days = get_previous_trading_days(self.date_str, num_days)
-        futures_positions = []
         
         print(f"[INFO] 抓取過去 {num_days} 個交易日的外資期貨淨部位（共嘗試 {len(trading_days)} 天）...")
         
-        for i, date in enumerate(trading_days):
-            try:
-                formatted_date = f"{date[:4]}/{date[4:6]}/{date[6:]}"
-                url = f"{self.TAIFEX_BASE_URL}/cht/3/futContractsDate"
-                params = {'queryDate': formatted_date}
-                
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                
-                tables = pd.read_html(StringIO(response.text))
-                
-                for table in tables:
-                    if len(table) < 2 or len(table.columns) < 5:
-                        continue
-                        
-                    for idx, row in table.iterrows():
-                        row_str = ' '.join([str(v) for v in row.values])
-                        
-                        if 'TX' in row_str or '臺股期貨' in row_str:
-                            for value in row.values:
-                                try:
-                                    value_str = str(value).replace(',', '').replace(' ', '').strip()
-                                    if value_str and value_str != 'nan' and value_str != '--':
-                                        if value_str.lstrip('-').replace('.', '').isdigit():
-                                            num_value = int(float(value_str))
-                                            if abs(num_value) > 1000:
-                                                futures_positions.append(num_value)
-                                                break
-                                except:
-                                    continue
-                            break
-                    if futures_positions and len(futures_positions) == i + 1:
-                        break
-                
-                if i < len(trading_days) - 1:
-                    time.sleep(1.5)  # TWSE API 限制
-                    
-            except Exception as e:
-                print(f"[WARNING] 抓取 {date} 期貨淨部位失敗: {e}")
-                continue
+        days = self._fetch_days(trading_days, self._fetch_futures_day, '期貨淨部位', 'history_futures')
+        futures_positions = [position for position in days if position is not None]
         
         print(f"[INFO] 成功抓取 {len(futures_positions)} 筆期貨淨部位數據")
         return {'futures_5d_avg': self._calc_avg(futures_positions, 5, as_int=True)}
     
+    def _fetch_institutional_day(self, date: str) -> Optional[Dict[str, float]]:
+        """單日三大法人買賣超（億元）：{'foreign', 'trust', 'total'} 中有資料的項目，全無資料時為 None"""
+        url = f"{self.TWSE_BASE_URL}/fund/BFI82U"
+        params = {'response': 'json', 'dayDate': date, 'type': 'day'}
+        
+        response = paced_get(self._session, url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response_json(response)
+        
+        day = {}
+        if data['stat'] == 'OK':
+            for row in data.get('data', []):
+                if len(row) >= 4:
+                    category = row[0]
+                    key = self.INSTITUTION_KEYS.get(category)
+                    if key is None and '外資及陸資' in category and '不含' in category:
+                        key = 'foreign'  # 名稱寫法若有變動（如全形括號），退回子字串比對
+                    if key is not None:
+                        day[key] = float(row[3].translate(_NUMBER_CLEANUP)) / 100_000_000
+        return day or None
+    
+    def _fetch_margin_day(self, date: str) -> Optional[float]:
+        """單日融資餘額變化（億元）"""
+        url = f"{self.TWSE_BASE_URL}/rwd/zh/marginTrading/MI_MARGN"
+        params = {'response': 'json', 'date': date, 'selectType': 'ALL'}
+        
+        response = paced_get(self._session, url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response_json(response)
+        
+        if data['stat'] == 'OK' and len(data['tables'][0]['data']) > 2:
+            margin_row = data['tables'][0]['data'][2]
+            prev_balance = float(margin_row[1].translate(_NUMBER_CLEANUP))
+            today_balance = float(margin_row[2].translate(_NUMBER_CLEANUP))
+            return (today_balance - prev_balance) / 100_000
+        return None
+    
+    def _fetch_futures_day(self, date: str) -> Optional[int]:
+        """單日外資台指期淨部位（口）：第一個含 TX/臺股期貨 的列中，絕對值 > 1000 的第一個數值"""
+        formatted_date = f"{date[:4]}/{date[4:6]}/{date[6:]}"
+        url = f"{self.TAIFEX_BASE_URL}/cht/3/futContractsDate"
+        params = {'queryDate': formatted_date}
+        
+        response = paced_get(self._session, url, params=params, timeout=10)
+        response.raise_for_status()
+        
+        return self._parse_futures_net(response.text)
+    
+    @staticmethod
+    def _first_large_int(values) -> Optional[int]:
+        """回傳 values 中第一個絕對值 > 1000 的整數（「--」、空白、nan 等非數字略過）"""
+        for value in values:
+            value_str = str(value).translate(_NUMBER_CLEANUP).strip()
+            if _NUMBER_CELL_RE.fullmatch(value_str):
+                num_value = int(float(value_str))
+                if abs(num_value) > 1000:
+                    return num_value
+        return None
+    
+    @classmethod
+    def _parse_futures_net(cls, html: str) -> Optional[int]:
+        """
+        從期貨三大法人頁面取出外資台指期淨部位
+        
+        只需要一個數字，直接以 lxml 走訪表格列取儲存格文字，不經過 pd.read_html
+        建立整批 DataFrame；頁面結構改變找不到 TX 列時，退回原本的 pd.read_html 解析
+        """
+        tree = lxml.html.fromstring(html)
+        for table in tree.iter('table'):
+            rows = [[td.text_content() for td in tr.xpath('./td')] for tr in table.xpath('./tr | ./*/tr')]
+            rows = [cells for cells in rows if cells]
+            if len(rows) < 2 or max(len(cells) for cells in rows) < 5:
+                continue
+            for cells in rows:
+                if any('TX' in cell or '臺股期貨' in cell for cell in cells):
+                    net = cls._first_large_int(cells)
+                    if net is not None:
+                        return net
+                    break
+        
+        try:
+            tables = pd.read_html(StringIO(html), match='TX|臺股期貨', flavor='lxml')
+        except ValueError:
+            return None
+        for table in tables:
+            if len(table) < 2 or len(table.columns) < 5:
+                continue
+            for row in table.itertuples(index=False):
+                if any('TX' in str(v) or '臺股期貨' in str(v) for v in row):
+                    net = cls._first_large_int(row)
+                    if net is not None:
+                        return net
+                    break
+        return None
+    
     def _calculate_stats(self, history: Dict[str, List]) -> Dict[str, Any]:
         """計算三大法人的統計值"""
         return {
-            'foreign_5d_avg': self._calc_avg(history['foreign'], 5),
-            'foreign_5d_sum': self._calc_sum(history['foreign'], 5),
-            'foreign_20d_avg': self._calc_avg(history['foreign'], 20),
-            'foreign_20d_sum': self._calc_sum(history['foreign'], 20),
-            'trust_5d_avg': self._calc_avg(history['trust'], 5),
-            'trust_5d_sum': self._calc_sum(history['trust'], 5),
+            **self._calc_window('foreign', history['foreign'], 5),
+            **self._calc_window('foreign', history['foreign'], 20),
+            **self._calc_window('trust', history['trust'], 5),
         }
     
     def _calc_avg(self, data_list: List, days: int, as_int: bool = False):
@@ -235,12 +302,14 @@ class HistoricalDataFetcher:
             return int(round(avg)) if as_int else round(avg, 2)
         return None
     
-    def _calc_sum(self, data_list: List, days: int):
-        """計算總和"""
+    def _calc_window(self, name: str, data_list: List, days: int) -> Dict[str, Any]:
+        """計算最近 days 日的平均與總和（{name}_{days}d_avg / _sum），同一區間只加總一次"""
+        avg = total = None
         if len(data_list) >= days:
-            recent = data_list[-days:]
-            return round(sum(recent), 2)
-        return None
+            recent_sum = sum(data_list[-days:])
+            avg = round(recent_sum / days, 2)
+            total = round(recent_sum, 2)
+        return {f'{name}_{days}d_avg': avg, f'{name}_{days}d_sum': total}
 
 
 if __name__ == '__main__':
@@ -251,17 +320,16 @@ if __name__ == '__main__':
     else:
         date = '20260123'
     
-    fetcher = HistoricalDataFetcher(date)
-    
-    print("=== 測試歷史數據抓取 ===\n")
-    inst_hist = fetcher.fetch_institutional_history(20)
-    print(f"\n三大法人歷史統計: {inst_hist}")
-    
-    margin_hist = fetcher.fetch_margin_history(20)
-    print(f"\n融資融券歷史統計: {margin_hist}")
-    
-    pc_hist = fetcher.fetch_pc_ratio_history(5)
-    print(f"\nP/C Ratio歷史統計: {pc_hist}")
-    
-    futures_hist = fetcher.fetch_futures_history(5)
-    print(f"\n期貨歷史統計: {futures_hist}")
+    with HistoricalDataFetcher(date) as fetcher:
+        print("=== 測試歷史數據抓取 ===\n")
+        inst_hist = fetcher.fetch_institutional_history(20)
+        print(f"\n三大法人歷史統計: {inst_hist}")
+        
+        margin_hist = fetcher.fetch_margin_history(20)
+        print(f"\n融資融券歷史統計: {margin_hist}")
+        
+        pc_hist = fetcher.fetch_pc_ratio_history(5)
+        print(f"\nP/C Ratio歷史統計: {pc_hist}")
+        
+        futures_hist = fetcher.fetch_futures_history(5)
+        print(f"\n期貨歷史統計: {futures_hist}")
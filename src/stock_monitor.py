@@ -6,28 +6,140 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
+import hashlib
 import json
 import os
+import sys
 import argparse
 from datetime import datetime, timedelta
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
 from typing import Dict, Any, List, Optional
-from io import StringIO
+from urllib.parse import urlencode
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from bs4 import BeautifulSoup
 
+try:
+    import orjson
+except ImportError:  # orjson 為選用加速套件，未安裝時退回標準 json
+    orjson = None
+
 # 匯入現有模組
 try:
+    from . import disk_cache
     from .risk_monitor import get_trading_date
+    from .http_utils import response_json, retry_after_seconds, wait_for_host
+    from .excel_styles import sign_font
     from .risk_monitor_history import get_previous_trading_days
 except ImportError:
+    import disk_cache
     from risk_monitor import get_trading_date
+    from http_utils import response_json, retry_after_seconds, wait_for_host
+    from excel_styles import sign_font
     from risk_monitor_history import get_previous_trading_days
 
+# 所有 StockDataFetcher 實例共用連線池：_fetch_5d_history 等流程會逐日建立新的 fetcher，
+# 共用 Session 讓 TWSE / TPEx 連線保持 keep-alive，不必每次請求重新建立 TCP/TLS。
+# 連線層不另設自動重試：重試由 fetch_stock_prices 的重試迴圈負責，每次重送都經過 wait_for_host 節流
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+HTTP_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+})
+
+
+# 千分位逗號移除表：str.translate 單次掃描即可，不必每格建立 replace 的中間字串
+_NO_COMMA = str.maketrans('', '', ',')
+
+
+def _parse_int(val) -> int:
+    """千分位整數字串轉 int，無法解析（如 '--'）時回傳 0；JSON 已是整數時直接回傳"""
+    if type(val) is int:
+        return val
+    try:
+        return int(str(val).translate(_NO_COMMA))
+    except ValueError:
+        return 0
+
+
+def _parse_margin_int(val) -> int:
+    """融資融券欄位：同 _parse_int，另將 '--' 視為 0"""
+    if type(val) is int:
+        return val
+    try:
+        return int(str(val).translate(_NO_COMMA).replace('--', '0'))
+    except ValueError:
+        return 0
+
+
+# TWSE 收盤行情價格欄位中需移除的字元：千分位、除權息標記 X、正號與漲跌顏色標籤
+_PRICE_NOISE_RE = re.compile(r'<p style= color:(?:green|red)>|</p>|[,X+]')
+
+
+def _parse_price(val) -> float:
+    """TWSE 收盤行情價格欄位：一次移除 _PRICE_NOISE_RE 雜訊字元，'--' 或空白為 0"""
+    try:
+        clean = _PRICE_NOISE_RE.sub('', str(val)).strip()
+        if clean == '--' or clean == '':
+            return 0.0
+        return float(clean)
+    except ValueError:
+        return 0.0
+
+
+def _parse_tpex_price(val) -> float:
+    """TPEx 收盤行情價格欄位：'---' 視為 0，移除千分位與正號"""
+    try:
+        clean = str(val).replace(',', '').replace('---', '0').replace('+', '').strip()
+        return float(clean) if clean else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _json_has_data(data: Dict[str, Any]) -> bool:
+    """TWSE 以 stat == 'OK' 表示有資料；TPEx 則看 tables 是否有資料列"""
+    if str(data.get('stat', '')).upper() == 'OK':
+        return True
+    return any(isinstance(table, dict) and table.get('data') for table in data.get('tables', []))
+
+
+def _cached_get_json(url: str, params: Dict[str, str], date_str: str, timeout: int) -> Dict[str, Any]:
+    """
+    GET 並回傳解析後的 JSON，以 URL + 參數快取於 data/cache/stock_http
+    （已結算日期的資料不會再變，永久沿用；當日資料依 disk_cache TTL 過期）
+    只快取有資料的回應，假日或暫時性錯誤的空回應不寫入，下次仍會重新請求
+    """
+    key = f"{url}?{urlencode(sorted(params.items()))}"
+    data = disk_cache.load('stock_http', key, date_str)
+    if data is not None:
+        return data
+    
+    wait_for_host(url)
+    response = HTTP_SESSION.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response_json(response)
+    if _json_has_data(data):
+        disk_cache.store('stock_http', key, data)
+    return data
+
+
+@lru_cache(maxsize=4)
+def _read_watchlist(path: str, mtime_ns: int, size: int) -> tuple:
+    """
+    解析自選股清單，以 (路徑, 修改時間, 大小) 為鍵快取
+    同一行程內多次建立 StockMonitor（如批次回補）不必重複讀檔；檔案變更後鍵不同即重新解析
+    解析失敗時拋出的例外不會被快取
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # orjson.JSONDecodeError 繼承自 json.JSONDecodeError，錯誤處理共用
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw.decode('utf-8'))
+    return tuple(data.get('watchlist', []))
+
+
 class StockDataFetcher:
     """個股資料抓取器 (支援上市 TWSE + 上櫃 TPEx)"""
     
@@ -84,9 +196,7 @@ class StockDataFetcher:
                 'selectType': 'ALLBUT0999'  # 全部但排除權證
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            data = _cached_get_json(url, params, self.date_str, timeout=15)
             
             if data.get('stat') != 'OK':
                 print(f"[WARNING] T86 API 返回錯誤: {data.get('stat')}")
@@ -99,12 +209,6 @@ class StockDataFetcher:
                     name = row[1].strip()
                     
                     # 解析數值 (移除逗號)
-                    def parse_int(val):
-                        try:
-                            return int(str(val).replace(',', ''))
-                        except:
-                            return 0
-                    
                     # T86 欄位順序:
                     # 0: 證券代號, 1: 證券名稱
                     # 2-4: 外陸資買/賣/淨 (不含自營商)
@@ -115,15 +219,15 @@ class StockDataFetcher:
                     # 17: 三大法人合計買賣超
                     result[code] = {
                         'name': name,
-                        'foreign_buy': parse_int(row[2]),
-                        'foreign_sell': parse_int(row[3]),
-                        'foreign_net': parse_int(row[4]),
-                        'trust_buy': parse_int(row[8]),
-                        'trust_sell': parse_int(row[9]),
-                        'trust_net': parse_int(row[10]),
-                        'dealer_buy': parse_int(row[11]) + parse_int(row[14]),  # 自行買賣 + 避險
-                        'dealer_sell': parse_int(row[12]) + parse_int(row[15]),
-                        'dealer_net': parse_int(row[13]) + parse_int(row[16]),
+                        'foreign_buy': _parse_int(row[2]),
+                        'foreign_sell': _parse_int(row[3]),
+                        'foreign_net': _parse_int(row[4]),
+                        'trust_buy': _parse_int(row[8]),
+                        'trust_sell': _parse_int(row[9]),
+                        'trust_net': _parse_int(row[10]),
+                        'dealer_buy': _parse_int(row[11]) + _parse_int(row[14]),  # 自行買賣 + 避險
+                        'dealer_sell': _parse_int(row[12]) + _parse_int(row[15]),
+                        'dealer_net': _parse_int(row[13]) + _parse_int(row[16]),
                     }
             
             self._institutional_cache = result
@@ -131,25 +235,23 @@ class StockDataFetcher:
             # 額外抓取權證 (0999) 三大法人資料
             try:
                 params['selectType'] = '0999'
-                resp_w = requests.get(url, params=params, timeout=15)
-                if resp_w.status_code == 200:
-                    data_w = resp_w.json()
-                    if data_w.get('stat') == 'OK':
-                        for row in data_w.get('data', []):
-                            if len(row) >= 17:
-                                code = row[0].strip()
-                                result[code] = {
-                                    'name': row[1].strip(),
-                                    'foreign_buy': parse_int(row[2]),
-                                    'foreign_sell': parse_int(row[3]),
-                                    'foreign_net': parse_int(row[4]),
-                                    'trust_buy': parse_int(row[8]),
-                                    'trust_sell': parse_int(row[9]),
-                                    'trust_net': parse_int(row[10]),
-                                    'dealer_buy': parse_int(row[11]) + parse_int(row[14]),
-                                    'dealer_sell': parse_int(row[12]) + parse_int(row[15]),
-                                    'dealer_net': parse_int(row[13]) + parse_int(row[16]),
-                                }
+                data_w = _cached_get_json(url, params, self.date_str, timeout=15)
+                if data_w.get('stat') == 'OK':
+                    for row in data_w.get('data', []):
+                        if len(row) >= 17:
+                            code = row[0].strip()
+                            result[code] = {
+                                'name': row[1].strip(),
+                                'foreign_buy': _parse_int(row[2]),
+                                'foreign_sell': _parse_int(row[3]),
+                                'foreign_net': _parse_int(row[4]),
+                                'trust_buy': _parse_int(row[8]),
+                                'trust_sell': _parse_int(row[9]),
+                                'trust_net': _parse_int(row[10]),
+                                'dealer_buy': _parse_int(row[11]) + _parse_int(row[14]),
+                                'dealer_sell': _parse_int(row[12]) + _parse_int(row[15]),
+                                'dealer_net': _parse_int(row[13]) + _parse_int(row[16]),
+                            }
             except Exception as e:
                 print(f"[WARNING] 抓取權證三大法人資料失敗: {e}")
 
@@ -175,9 +277,7 @@ class StockDataFetcher:
                 '_': '1'
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            data = _cached_get_json(url, params, self.date_str, timeout=15)
             
             result = {}
             tables = data.get('tables', [])
@@ -189,12 +289,6 @@ class StockDataFetcher:
                         code = str(row[0]).strip()
                         name = str(row[1]).strip()
                         
-                        def parse_int(val):
-                            try:
-                                return int(str(val).replace(',', ''))
-                            except:
-                                return 0
-                        
                         # TPEx 欄位順序:
                         # 0: 代號, 1: 名稱
                         # 2-4: 外資買/賣/淨 (不含自營商)
@@ -207,15 +301,15 @@ class StockDataFetcher:
                         # 23: 三大法人合計
                         result[code] = {
                             'name': name,
-                            'foreign_buy': parse_int(row[2]),
-                            'foreign_sell': parse_int(row[3]),
-                            'foreign_net': parse_int(row[4]),
-                            'trust_buy': parse_int(row[11]),
-                            'trust_sell': parse_int(row[12]),
-                            'trust_net': parse_int(row[13]),
-                            'dealer_buy': parse_int(row[14]) + parse_int(row[17]),
-                            'dealer_sell': parse_int(row[15]) + parse_int(row[18]),
-                            'dealer_net': parse_int(row[16]) + parse_int(row[19]),
+                            'foreign_buy': _parse_int(row[2]),
+                            'foreign_sell': _parse_int(row[3]),
+                            'foreign_net': _parse_int(row[4]),
+                            'trust_buy': _parse_int(row[11]),
+                            'trust_sell': _parse_int(row[12]),
+                            'trust_net': _parse_int(row[13]),
+                            'dealer_buy': _parse_int(row[14]) + _parse_int(row[17]),
+                            'dealer_sell': _parse_int(row[15]) + _parse_int(row[18]),
+                            'dealer_net': _parse_int(row[16]) + _parse_int(row[19]),
                         }
             
             return result
@@ -253,9 +347,7 @@ class StockDataFetcher:
                 'selectType': 'ALL'
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            data = _cached_get_json(url, params, self.date_str, timeout=15)
             
             if data.get('stat') != 'OK':
                 print(f"[WARNING] 融資融券 API 返回錯誤: {data.get('stat')}")
@@ -271,16 +363,10 @@ class StockDataFetcher:
                     if len(row) >= 13:
                         code = row[0].strip()
                         
-                        def parse_int(val):
-                            try:
-                                return int(str(val).replace(',', '').replace('--', '0'))
-                            except:
-                                return 0
-                        
                         # TWSE MI_MARGN 融券欄位以「股」(units) 回傳，需除以 1000 轉為「張」
                         # 融資欄位已是千股（=張），無需換算
-                        raw_short_bal = parse_int(row[12])
-                        raw_prev_short = parse_int(row[7]) if row[7] != '--' else None
+                        raw_short_bal = _parse_margin_int(row[12])
+                        raw_prev_short = _parse_margin_int(row[7]) if row[7] != '--' else None
                         raw_short_change = (raw_short_bal - raw_prev_short) if raw_prev_short is not None else 0
                         # 偵測單位：若餘額 > 200_000（超過任何個股合理融券張數），視為以株計，除以 1000
                         if raw_short_bal > 200_000:
@@ -291,12 +377,12 @@ class StockDataFetcher:
                             short_change = raw_short_change
 
                         result[code] = {
-                            'margin_buy': parse_int(row[2]),
-                            'margin_sell': parse_int(row[3]),
-                            'margin_balance': parse_int(row[6]),
-                            'margin_change': parse_int(row[6]) - parse_int(row[1]) if row[1] != '--' else 0,
-                            'short_sell': parse_int(row[8]),
-                            'short_buy': parse_int(row[9]),
+                            'margin_buy': _parse_margin_int(row[2]),
+                            'margin_sell': _parse_margin_int(row[3]),
+                            'margin_balance': _parse_margin_int(row[6]),
+                            'margin_change': _parse_margin_int(row[6]) - _parse_margin_int(row[1]) if row[1] != '--' else 0,
+                            'short_sell': _parse_margin_int(row[8]),
+                            'short_buy': _parse_margin_int(row[9]),
                             'short_balance': short_balance,
                             'short_change': short_change,
                         }
@@ -325,9 +411,7 @@ class StockDataFetcher:
                 '_': '1'
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            data = _cached_get_json(url, params, self.date_str, timeout=15)
             
             result = {}
             # TPEx API: 資料在 tables[0]['data']
@@ -338,20 +422,14 @@ class StockDataFetcher:
                     if len(row) >= 7:
                         code = str(row[0]).strip()
                         
-                        def parse_int(val):
-                            try:
-                                return int(str(val).replace(',', '').replace('--', '0'))
-                            except:
-                                return 0
-                        
                         # TPEx 融資融券欄位:
                         # 0: 代號, 1: 名稱
                         # 2: 前日融資餘額, 3: 融資買進, 4: 融資賣出, 5: 現金償還, 6: 今日融資餘額
                         result[code] = {
-                            'margin_buy': parse_int(row[3]) if len(row) > 3 else 0,
-                            'margin_sell': parse_int(row[4]) if len(row) > 4 else 0,
-                            'margin_balance': parse_int(row[6]) if len(row) > 6 else 0,
-                            'margin_change': parse_int(row[6]) - parse_int(row[2]) if len(row) > 6 else 0,
+                            'margin_buy': _parse_margin_int(row[3]) if len(row) > 3 else 0,
+                            'margin_sell': _parse_margin_int(row[4]) if len(row) > 4 else 0,
+                            'margin_balance': _parse_margin_int(row[6]) if len(row) > 6 else 0,
+                            'margin_change': _parse_margin_int(row[6]) - _parse_margin_int(row[2]) if len(row) > 6 else 0,
                             'short_sell': None,
                             'short_buy': None,
                             'short_balance': None,
@@ -375,9 +453,9 @@ class StockDataFetcher:
             # 認購售權證基本資料 (t187ap37_L)
             url = "https://openapi.twse.com.tw/v1/opendata/t187ap37_L"
             print(f"[DEBUG] Fetching warrant master from {url}...")
-            response = requests.get(url, timeout=30)
+            response = HTTP_SESSION.get(url, timeout=30)
             response.raise_for_status()
-            data = response.json()
+            data = response_json(response)
             print(f"[DEBUG] Received {len(data)} warrant master items")
             
             def pick_first(item: Dict[str, Any], *keys: str, default: Any = '') -> Any:
@@ -446,7 +524,7 @@ class StockDataFetcher:
         }
         
         try:
-            res = requests.get(url, headers=headers, timeout=10)
+            res = HTTP_SESSION.get(url, headers=headers, timeout=10)
             res.encoding = res.apparent_encoding # 自動偵測編碼 (通常是 utf-8 或 big5)
             soup = BeautifulSoup(res.text, 'html.parser')
             
@@ -516,9 +594,7 @@ class StockDataFetcher:
                     'type': 'ALLBUT0999'
                 }
                 
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+                data = _cached_get_json(url, params, self.date_str, timeout=30)
                 
                 if data.get('stat') != 'OK':
                     # stat 非 OK 通常表示假日或無資料，不需重試
@@ -530,23 +606,6 @@ class StockDataFetcher:
                 # 嘗試從多個表格抓取收盤行情 (Table 8 為個股, Table 9 為權證)
                 tables = data.get('tables', [])
                 
-                def parse_float(val):
-                    try:
-                        clean = str(val).replace(',', '').replace('X', '')
-                        clean = clean.replace('<p style= color:green>', '').replace('<p style= color:red>', '').replace('</p>', '')
-                        clean = clean.replace('+', '').strip()
-                        if clean == '--' or clean == '':
-                            return 0.0
-                        return float(clean)
-                    except:
-                        return 0.0
-
-                def parse_int(val):
-                    try:
-                        return int(str(val).replace(',', ''))
-                    except:
-                        return 0
-
                 def process_table(table_data):
                     fields = table_data.get('fields', [])
                     field_idx = {str(name).strip(): idx for idx, name in enumerate(fields)}
@@ -579,9 +638,9 @@ class StockDataFetcher:
                         if not code.isdigit():
                             continue
 
-                        close = parse_float(row[close_idx])
-                        change_val = parse_float(row[change_idx])
-                        volume = parse_int(row[volume_idx]) // 1000  # 股數 -> 張
+                        close = _parse_price(row[close_idx])
+                        change_val = _parse_price(row[change_idx])
+                        volume = _parse_int(row[volume_idx]) // 1000  # 股數 -> 張
 
                         if 'green' in str(row[sign_idx]):
                             change_val = -abs(change_val)
@@ -601,15 +660,15 @@ class StockDataFetcher:
 
                         if bid_idx is not None and ask_idx is not None and len(row) > max(bid_idx, ask_idx):
                             result[code].update({
-                                'bid': parse_float(row[bid_idx]),
-                                'ask': parse_float(row[ask_idx]),
+                                'bid': _parse_price(row[bid_idx]),
+                                'ask': _parse_price(row[ask_idx]),
                             })
 
                         if underlying_code_idx is not None and len(row) > underlying_code_idx:
                             result[code]['underlying_code'] = str(row[underlying_code_idx]).strip()
 
                         if underlying_price_idx is not None and len(row) > underlying_price_idx:
-                            result[code]['underlying_price'] = parse_float(row[underlying_price_idx])
+                            result[code]['underlying_price'] = _parse_price(row[underlying_price_idx])
 
                 # 處理個股 (ALLBUT0999)
                 for table in tables:
@@ -621,17 +680,15 @@ class StockDataFetcher:
                     try:
                         params['type'] = '0999'
                         print(f"[DEBUG] Fetching warrant prices for {self.date_str}...")
-                        resp_w = requests.get(url, params=params, timeout=60) # 權證資料很大，給 60s
-                        if resp_w.status_code == 200:
-                            data_w = resp_w.json()
-                            if data_w.get('stat') == 'OK':
-                                w_count = 0
-                                for table in data_w.get('tables', []):
-                                    if '每日收盤行情' in table.get('title', ''):
-                                        start_count = len(result)
-                                        process_table(table)
-                                        w_count += (len(result) - start_count)
-                                print(f"[DEBUG] Added {w_count} warrant prices")
+                        data_w = _cached_get_json(url, params, self.date_str, timeout=60) # 權證資料很大，給 60s
+                        if data_w.get('stat') == 'OK':
+                            w_count = 0
+                            for table in data_w.get('tables', []):
+                                if '每日收盤行情' in table.get('title', ''):
+                                    start_count = len(result)
+                                    process_table(table)
+                                    w_count += (len(result) - start_count)
+                            print(f"[DEBUG] Added {w_count} warrant prices")
                     except Exception as e:
                         print(f"[WARNING] 抓取權證股價失敗: {e}")
                 
@@ -648,6 +705,10 @@ class StockDataFetcher:
                 last_error = e
                 if attempt < MAX_RETRIES:
                     wait = attempt * 3
+                    # 被限流 (429) 時依伺服器的 Retry-After 等待
+                    response = getattr(e, 'response', None)
+                    if response is not None and response.status_code == 429:
+                        wait = retry_after_seconds(response, wait)
                     print(f"[WARNING] 抓取股價資料失敗 (第{attempt}次): {e}，{wait}秒後重試...")
                     time.sleep(wait)
                 else:
@@ -665,9 +726,7 @@ class StockDataFetcher:
                 '_': '1'
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            data = _cached_get_json(url, params, self.date_str, timeout=15)
             
             result = {}
             # TPEx API: 資料在 tables[0]['data']
@@ -678,25 +737,12 @@ class StockDataFetcher:
                     if len(row) >= 9:
                         code = str(row[0]).strip()
                         
-                        def parse_float(val):
-                            try:
-                                clean = str(val).replace(',', '').replace('---', '0').replace('+', '').strip()
-                                return float(clean) if clean else 0.0
-                            except:
-                                return 0.0
-                        
-                        def parse_int(val):
-                            try:
-                                return int(str(val).replace(',', ''))
-                            except:
-                                return 0
-                        
                         # TPEx 股價欄位:
                         # 0: 代號, 1: 名稱, 2: 收盤, 3: 漲跌, 4: 開盤, 
                         # 5: 最高, 6: 最低, 7: 均價, 8: 成交股數
-                        close = parse_float(row[2])
-                        change_val = parse_float(row[3])
-                        volume = parse_int(row[8]) // 1000 if len(row) > 8 else 0
+                        close = _parse_tpex_price(row[2])
+                        change_val = _parse_tpex_price(row[3])
+                        volume = _parse_int(row[8]) // 1000 if len(row) > 8 else 0
                         
                         pct_change = 0.0
                         if close > 0 and (close - change_val) != 0:
@@ -735,9 +781,10 @@ class StockDataFetcher:
                 'stockNo': stock_code
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            wait_for_host(url)
+            response = HTTP_SESSION.get(url, params=params, timeout=15)
             response.raise_for_status()
-            data = response.json()
+            data = response_json(response)
             
             if data.get('stat') != 'OK':
                 return []
@@ -761,26 +808,41 @@ class StockDataFetcher:
 class StockMonitor:
     """個股籌碼監控主類別"""
     
-    def __init__(self, date_str: str, watchlist_path: str = 'data/config/watchlist.json'):
+    OUTPUT_DIR = 'monitor_xlsx'  # Excel / CSV 報表輸出目錄
+    # Excel 各欄欄寬 (含進階指標欄位)
+    EXCEL_COL_WIDTHS = (10, 12, 10, 10, 10, 12, 14, 14, 14, 14, 14, 12, 12, 12, 12)
+    EXCEL_COL_LETTERS = tuple('ABCDEFGHIJKLMNO')  # 與欄寬一一對應的欄位字母，免去逐欄 get_column_letter
+    # CSV 欄位：(表頭, stock_data 欄位)，日期欄另行加在最前面
+    CSV_COLUMNS = (
+        ('股票代號', 'code'), ('股票名稱', 'name'), ('市場別', 'market'), ('收盤價', 'close'),
+        ('成交量(張)', 'volume'), ('外資當日(張)', 'foreign_daily'), ('外資5日累計', 'foreign_5d_sum'),
+        ('投信當日(張)', 'trust_daily'), ('投信5日累計', 'trust_5d_sum'), ('自營商當日(張)', 'dealer_daily'),
+        ('融資增減(張)', 'margin_daily_change'), ('融資5日累計', 'margin_5d_sum'),
+        ('融券增減(張)', 'lending_daily_change'), ('MA20乖離(%)', 'dist_ma20'),
+    )
+    
+    def __init__(self, date_str: str, watchlist_path: str = 'data/config/watchlist.json', refresh: bool = False):
         """
         Args:
             date_str: 日期字串，格式 YYYYMMDD
             watchlist_path: 自選股清單路徑
+            refresh: True 時忽略整體結果與 API 回應快取，重新抓取
         """
         self.date_str = date_str
         self.watchlist_path = watchlist_path
+        self.refresh = refresh
         self.watchlist = []
         self.stock_data = {}
         self.warrant_data = {}
+        self._ma20_complete_codes = set()  # 已有完整 20 日收盤價的代號（由 _compute_ma20_from_stored_json 填入）
     
     def load_watchlist(self) -> List[Dict[str, str]]:
         """載入自選股清單"""
         try:
-            with open(self.watchlist_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.watchlist = data.get('watchlist', [])
-                print(f"[INFO] 已載入 {len(self.watchlist)} 檔自選股")
-                return self.watchlist
+            stat = os.stat(self.watchlist_path)
+            self.watchlist = list(_read_watchlist(self.watchlist_path, stat.st_mtime_ns, stat.st_size))
+            print(f"[INFO] 已載入 {len(self.watchlist)} 檔自選股")
+            return self.watchlist
         except FileNotFoundError:
             print(f"[ERROR] 找不到自選股清單: {self.watchlist_path}")
             return []
@@ -797,22 +859,42 @@ class StockMonitor:
             print("[ERROR] 沒有任何自選股")
             return
         
+        # 同一日期 + 同一份自選股的完整結果已快取時，直接還原，跳過所有抓取與計算
+        cache_key = self._result_cache_key()
+        if self.refresh:
+            disk_cache.bypass_reads('stock_http')
+        cached = None if self.refresh else disk_cache.load('stock_data', cache_key, self.date_str)
+        if cached is not None:
+            self.stock_data, self.warrant_data = cached
+            print(f"[INFO] 使用 {self.date_str} 個股籌碼快取（--refresh 可強制重抓）")
+            return
+        
         print(f"\n[INFO] 開始抓取 {self.date_str} 的個股籌碼資料...\n")
         
-        # 抓取當日資料
-        print("[1/4] 抓取三大法人個股買賣超...")
+        # 當日三項資料與 5 日累計彼此獨立，皆為等待網路回應的 I/O，以執行緒併發抓取
         fetcher = StockDataFetcher(self.date_str)
-        institutional = fetcher.fetch_institutional_trading()
-        
-        print("[2/4] 抓取融資融券餘額...")
-        margin = fetcher.fetch_margin_trading()
-        
-        print("[3/4] 抓取個股收盤行情...")
-        prices = fetcher.fetch_stock_prices()
+        print("[INFO] 併發抓取：三大法人 / 融資融券 / 收盤行情 / 5 日累計...")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            institutional_future = executor.submit(fetcher.fetch_institutional_trading)
+            margin_future = executor.submit(fetcher.fetch_margin_trading)
+            prices_future = executor.submit(fetcher.fetch_stock_prices)
+            # 抓取過去 5 天資料計算累計
+            history_future = executor.submit(self._fetch_5d_history)
+            steps = {
+                institutional_future: "[1/4] 三大法人個股買賣超",
+                margin_future: "[2/4] 融資融券餘額",
+                prices_future: "[3/4] 個股收盤行情",
+                history_future: "[4/4] 5 日累計數據",
+            }
+            # 各步驟於實際完成時才印出，才看得出哪一項仍在執行或卡住
+            for future in as_completed(steps):
+                status = "失敗" if future.exception() is not None else "完成"
+                print(f"{steps[future]} {status}")
         
-        # 抓取過去 5 天資料計算累計
-        print("[4/4] 計算 5 日累計數據...")
-        history_data = self._fetch_5d_history()
+        institutional = institutional_future.result()
+        margin = margin_future.result()
+        prices = prices_future.result()
+        history_data = history_future.result()
         
         # 整合資料
         for stock in self.watchlist:
@@ -927,6 +1009,12 @@ class StockMonitor:
                 'volume_5d': hist.get('volume_5d', 0),
             }
         
+        # 只快取三項當日資料皆有回應、且個股 5 日累計與 MA20 皆完整的結果，避免把暫時性的抓取失敗或
+        # 不足的歷史資料固定下來（權證不使用歷史資料，不列入判斷）
+        history_complete = all(history_data.get(code, {}).get('history_complete') for code in self.stock_data)
+        if institutional and margin and prices and history_complete:
+            disk_cache.store('stock_data', cache_key, (self.stock_data, self.warrant_data))
+        
         print(f"[DEBUG] self.warrant_data size: {len(self.warrant_data)}")
         if '055145' in self.warrant_data:
             print(f"[DEBUG] 055145 Warrant Data: {self.warrant_data['055145']}")
@@ -935,18 +1023,28 @@ class StockMonitor:
             
         print("\n[SUCCESS] 個股籌碼資料抓取完成！\n")
     
+    def _result_cache_key(self) -> str:
+        """整體結果快取鍵：日期 + 自選股清單內容摘要（清單順序影響輸出順序，一併納入）"""
+        digest = hashlib.blake2b(json.dumps(self.watchlist, ensure_ascii=False, sort_keys=True).encode('utf-8'),
+                                 digest_size=8).hexdigest()
+        return f"{self.date_str}_{digest}"
+    
     def _compute_ma20_from_stored_json(self) -> Dict[str, Optional[float]]:
         """從 outputs/json/ 已存檔 JSON 計算個股 20 日均價（不額外打 API）。"""
         import glob
         json_dir = os.path.join('outputs', 'json')
         pattern = os.path.join(json_dir, '????????.json')
-        today_file = os.path.join(json_dir, f'{self.date_str}.json')
-        # 取最近 25 份檔（預留假日緩衝），排除今日（今日可能尚未完成）
-        all_files = sorted(f for f in glob.glob(pattern) if os.path.basename(f) != f'{self.date_str}.json')
+        # 取報告日之前最近 25 份檔（預留假日緩衝）：排除今日（今日可能尚未完成），
+        # 回補過去日期時也不可混入報告日之後的檔案
+        all_files = sorted(f for f in glob.glob(pattern) if os.path.basename(f)[:8] < self.date_str)
         recent_files = all_files[-25:]
 
+        codes = {str(stock['code']) for stock in self.watchlist}
         prices_by_code: Dict[str, List[float]] = {}
         for fpath in reversed(recent_files):  # 最新到最舊
+            # 自選股皆已湊滿 20 日收盤價，較舊的檔案不會再用到
+            if codes and all(len(prices_by_code.get(code, [])) >= 20 for code in codes):
+                break
             try:
                 with open(fpath, encoding='utf-8') as fp:
                     data = json.load(fp)
@@ -961,11 +1059,13 @@ class StockMonitor:
                 continue
 
         result: Dict[str, Optional[float]] = {}
+        self._ma20_complete_codes = set()
         for stock in self.watchlist:
             code = str(stock['code'])
             closes = prices_by_code.get(code, [])
             if len(closes) >= 20:
                 result[code] = round(sum(closes[:20]) / 20, 2)
+                self._ma20_complete_codes.add(code)
             elif len(closes) >= 5:
                 # 歷史資料不足 20 天時退而求其次，用現有資料，並標記
                 result[code] = round(sum(closes) / len(closes), 2)
@@ -979,30 +1079,36 @@ class StockMonitor:
         result = {}
         
         # Include the report date in the rolling 5-day window.
-        candidate_days = get_previous_trading_days(self.date_str, 5, buffer_days=10)
+        # 交易日曆已排除週末與休假日；由新到舊嘗試，buffer_days 只在近日缺資料時才會用到
+        candidate_days = list(reversed(get_previous_trading_days(self.date_str, 5, buffer_days=10)))
         # 收集歷史資料
         history_institutional = {}
         history_margin = {}
         history_prices = {}
         
-        valid_days_count = 0
-        
-        for date in candidate_days:
-            if valid_days_count >= 5:
-                break
-                
-            print(f"    嘗試抓取 {date} 歷史資料... (已收集 {valid_days_count}/5)")
+        # 各日期彼此獨立，以執行緒併發抓取；實際發出的請求由 http_utils 各主機共用節流器間隔，
+        # 與同時執行的 RiskMonitor / HistoricalDataFetcher 合計不超過 TWSE 限制（命中快取不等待）
+        def fetch_day(date):
+            print(f"    嘗試抓取 {date} 歷史資料...")
             fetcher = StockDataFetcher(date)
-            
             # 以股價資料是否存在來判斷是否為真實開市日
             prices = fetcher.fetch_stock_prices(include_warrants=False)
             if not prices:
                 print(f"    - {date} 無資料 (可能是假日)，跳過")
-                time.sleep(1.0)
-                continue
-                
-            valid_days_count += 1
-            
+                return None
+            inst = fetcher.fetch_institutional_trading()
+            margin = fetcher.fetch_margin_trading()
+            return prices, inst, margin
+        
+        # 每批只嘗試「還缺幾天」個候選日（由新到舊），結果與逐日嘗試相同：取最近 5 個有資料的交易日
+        valid_days = []
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            while len(valid_days) < 5 and candidate_days:
+                batch = candidate_days[:5 - len(valid_days)]
+                candidate_days = candidate_days[len(batch):]
+                valid_days.extend(day for day in executor.map(fetch_day, batch) if day is not None)
+        
+        for prices, inst, margin in valid_days:
             for code, data in prices.items():
                 if code not in history_prices:
                     history_prices[code] = []
@@ -1011,22 +1117,20 @@ class StockMonitor:
                     'volume': data.get('volume', 0)
                 })
             
-            inst = fetcher.fetch_institutional_trading()
             for code, data in inst.items():
                 if code not in history_institutional:
                     history_institutional[code] = []
                 history_institutional[code].append(data)
             
-            margin = fetcher.fetch_margin_trading()
             for code, data in margin.items():
                 if code not in history_margin:
                     history_margin[code] = []
                 history_margin[code].append(data)
-            
-            time.sleep(2.0)  # 避免請求太頻繁 (TWSE API 限制)
         
         # MA20：從已存 JSON 讀取，不額外打 API
         ma20_by_code = self._compute_ma20_from_stored_json()
+        # 5 個交易日皆取得法人與融資資料，才算完整的 5 日累計
+        days_complete = len(valid_days) == 5 and all(inst and margin for _, inst, margin in valid_days)
 
         # 計算累計值
         for stock in self.watchlist:
@@ -1061,6 +1165,8 @@ class StockMonitor:
                 'margin_5d_sum': round(margin_5d, 0),
                 'ma20': ma20_by_code.get(str(code)),
                 'volume_5d': volume_5d,
+                # 5 日累計與 MA20 皆為完整資料（非部分日期或不足 20 日的均價），供整體結果快取判斷
+                'history_complete': days_complete and str(code) in self._ma20_complete_codes,
             }
 
         return result
@@ -1105,22 +1211,39 @@ class StockMonitor:
         print(tabulate(table_data, headers=headers, tablefmt='grid'))
         print()
     
+    def _output_path(self, filename: str) -> str:
+        """回傳報表輸出路徑，兩種匯出共用同一輸出目錄（不存在時建立）"""
+        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
+        return os.path.join(self.OUTPUT_DIR, filename)
+    
     def export_to_excel(self, filename: str = None):
         """匯出到 Excel 檔案"""
         if filename is None:
             filename = f"stock_monitor_{self.date_str}.xlsx"
         
+        # openpyxl 只在匯出 Excel 時才需要，延遲匯入以加快模組載入
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, Alignment, PatternFill
+        
         print(f"[INFO] 正在生成 Excel 報表...")
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "個股籌碼監控"
+        # write_only 模式逐列串流寫出，不在記憶體中建立完整儲存格物件；
+        # 欄寬與合併儲存格須在寫入資料列之前設定
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("個股籌碼監控")
+        
+        # 調整欄寬 (含進階指標欄位)
+        for letter, width in zip(self.EXCEL_COL_LETTERS, self.EXCEL_COL_WIDTHS):
+            ws.column_dimensions[letter].width = width
         
         # 標題
-        ws['A1'] = f"個股籌碼監控報告 - {self.date_str}"
-        ws['A1'].font = Font(size=16, bold=True)
-        ws.merge_cells('A1:O1')
-        ws['A1'].alignment = Alignment(horizontal='center')
+        title = WriteOnlyCell(ws, value=f"個股籌碼監控報告 - {self.date_str}")
+        title.font = Font(size=16, bold=True)
+        title.alignment = Alignment(horizontal='center')
+        ws.merged_cells.add('A1:O1')
+        ws.append([title])
+        ws.append([])
         
         # 表頭
         headers = [
@@ -1132,48 +1255,52 @@ class StockMonitor:
         header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
         
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col, value=header)
+        header_alignment = Alignment(horizontal='center')
+        
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
             cell.fill = header_fill
             cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        # 條件格式字型在迴圈外建立一次，各列共用
+        green_font = Font(color="008000")
+        red_font = Font(color="FF0000")
         
         # 資料行
-        row = 4
         for code, data in self.stock_data.items():
-            ws.cell(row, 1, data['code'])
-            ws.cell(row, 2, data['name'])
-            ws.cell(row, 3, data.get('market', ''))
-            ws.cell(row, 4, data['close'])
-            ws.cell(row, 5, data['pct_change'])
-            ws.cell(row, 6, data['volume'])
-            ws.cell(row, 7, data['foreign_daily'])
-            ws.cell(row, 8, data['foreign_5d_sum'])
-            ws.cell(row, 9, data['trust_daily'])
-            ws.cell(row, 10, data['trust_5d_sum'])
-            ws.cell(row, 11, data['dealer_daily'])
-            ws.cell(row, 12, data['margin_daily_change'])
-            ws.cell(row, 13, data['margin_5d_sum'])
-            ws.cell(row, 14, data['lending_daily_change'])
-            ws.cell(row, 15, data['dist_ma20'])
-            
-            # 條件格式 - 外資買超綠色，賣超紅色
-            if data['foreign_daily'] and data['foreign_daily'] > 0:
-                ws.cell(row, 7).font = Font(color="008000")
-            elif data['foreign_daily'] and data['foreign_daily'] < 0:
-                ws.cell(row, 7).font = Font(color="FF0000")
+            foreign_daily = data['foreign_daily']
+            # 條件格式 - 外資買超綠色，賣超紅色；無買賣超時直接寫入數值，不建立儲存格物件
+            font = sign_font(foreign_daily, green_font, red_font)
+            if font is not None:
+                foreign_cell = WriteOnlyCell(ws, value=foreign_daily)
+                foreign_cell.font = font
+            else:
+                foreign_cell = foreign_daily
             
-            row += 1
-        
-        # 調整欄寬 (含進階指標欄位)
-        col_widths = [10, 12, 10, 10, 10, 12, 14, 14, 14, 14, 14, 12, 12, 12, 12]
-        for i, width in enumerate(col_widths, start=1):
-            ws.column_dimensions[get_column_letter(i)].width = width
+            ws.append([
+                data['code'],
+                data['name'],
+                data.get('market', ''),
+                data['close'],
+                data['pct_change'],
+                data['volume'],
+                foreign_cell,
+                data['foreign_5d_sum'],
+                data['trust_daily'],
+                data['trust_5d_sum'],
+                data['dealer_daily'],
+                data['margin_daily_change'],
+                data['margin_5d_sum'],
+                data['lending_daily_change'],
+                data['dist_ma20'],
+            ])
         
         # 儲存
-        output_dir = 'monitor_xlsx'
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, filename)
+        output_path = self._output_path(filename)
         
         wb.save(output_path)
         print(f"[SUCCESS] Excel 報表已儲存至: {output_path}\n")
@@ -1185,33 +1312,13 @@ class StockMonitor:
         
         print(f"[INFO] 正在生成 CSV 報表...")
         
-        # 準備資料
-        rows = []
-        for code, data in self.stock_data.items():
-            rows.append({
-                '日期': self.date_str,
-                '股票代號': data.get('code', ''),
-                '股票名稱': data.get('name', ''),
-                '市場別': data.get('market', ''),
-                '收盤價': data.get('close'),
-                '成交量(張)': data.get('volume'),
-                '外資當日(張)': data.get('foreign_daily'),
-                '外資5日累計': data.get('foreign_5d_sum'),
-                '投信當日(張)': data.get('trust_daily'),
-                '投信5日累計': data.get('trust_5d_sum'),
-                '自營商當日(張)': data.get('dealer_daily'),
-                '融資增減(張)': data.get('margin_daily_change'),
-                '融資5日累計': data.get('margin_5d_sum'),
-                '融券增減(張)': data.get('lending_daily_change'),
-                'MA20乖離(%)': data.get('dist_ma20'),
-            })
-        
-        df = pd.DataFrame(rows)
+        fields = [field for _, field in self.CSV_COLUMNS]
+        # map(data.get, ...) 在 C 層逐欄取值；仍以 get 容許缺欄（寫為空欄）
+        rows = [[self.date_str, *map(data.get, fields)] for data in self.stock_data.values()]
+        df = pd.DataFrame(rows, columns=['日期'] + [header for header, _ in self.CSV_COLUMNS])
         
         # 儲存
-        output_dir = 'monitor_xlsx'
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, filename)
+        output_path = self._output_path(filename)
         
         df.to_csv(output_path, index=False, encoding='utf-8-sig')
         print(f"[SUCCESS] CSV 報表已儲存至: {output_path}\n")
@@ -1258,6 +1365,12 @@ def main():
     
 
     
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='忽略個股籌碼與 TWSE/TPEx 回應快取，重新抓取'
+    )
+    
     parser.add_argument(
         '--csv',
         action='store_true',
@@ -1274,7 +1387,7 @@ def main():
     
     # 執行監控
     try:
-        monitor = StockMonitor(trading_date, args.watchlist)
+        monitor = StockMonitor(trading_date, args.watchlist, refresh=args.refresh)
         monitor.load_watchlist()
         monitor.fetch_all_data()
         monitor.display()
@@ -1302,4 +1415,4 @@ def main():
 
 
 if __name__ == '__main__':
-    exit(main())
+    sys.exit(main())
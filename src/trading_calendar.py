@@ -6,10 +6,13 @@
 """
 
 import yfinance as yf
+import numpy as np
 import pandas as pd
+import bisect
 import json
 import os
 import requests
+import threading
 from datetime import datetime, timedelta
 from typing import List, Optional
 
@@ -108,15 +111,7 @@ class TradingCalendar:
             
         if not self.trading_days:
              print("[ERROR] 無法取得交易日曆，回退到原始推算模式")
-             # Fallback
-             target_date = datetime.strptime(target_date_str, '%Y%m%d')
-             days = []
-             current = target_date
-             while len(days) < requested_days:
-                 if current.weekday() < 5:
-                     days.append(current.strftime('%Y%m%d'))
-                 current -= timedelta(days=1)
-             return list(reversed(days))
+             return self._estimate_business_days(target_date_str, requested_days)
 
         # 智慧判斷：如果 target_date_str <= 今天，且不包含在 trading_days 內
         # 我們檢查它是否為週末或國定假日，如果都不是，代表它應該要有資料，我們就強制更新
@@ -135,29 +130,45 @@ class TradingCalendar:
             except ValueError:
                 pass
 
-        # 篩選出所有小於等於 target_date_str 的交易日
-        valid_days = [d for d in self.trading_days if d <= target_date_str]
-        
-        if not valid_days:
+        # trading_days 已排序，以二分搜尋定位 target_date_str，不必逐日掃描整份日曆
+        if not self._days_until(target_date_str, 1):
             # 可能是很早以前的日期或是剛好還沒更新到今天
              print(f"[WARNING] 找不到 {target_date_str} 或之前的交易紀錄。")
              self.update_calendar(force=True)
-             valid_days = [d for d in self.trading_days if d <= target_date_str]
              
-             if not valid_days:
+             if not self._days_until(target_date_str, 1):
                   return []
 
         # 取最後 num_days 筆；buffer_days 會額外回傳候選交易日，供呼叫端略過缺資料日期。
-        result = valid_days[-requested_days:]
+        result = self._days_until(target_date_str, requested_days)
         
         if len(result) < requested_days:
             print(f"[WARNING] 快取的交易日數量不足 ({len(result)} < {requested_days})，將抓取更早之前的歷史。")
             self.update_calendar(years_back=20, force=True) # 嘗試抓取更多
-            valid_days = [d for d in self.trading_days if d <= target_date_str]
-            result = valid_days[-requested_days:]
+            result = self._days_until(target_date_str, requested_days)
             
         return result
 
+    def _estimate_business_days(self, target_date_str: str, count: int) -> List[str]:
+        """
+        無交易日曆時的推算：小於等於 target_date_str 的最後 count 個營業日（舊→新）
+        
+        以 numpy.busday_offset 一次算出，排除週末與已快取的 TWSE 休假日
+        """
+        datetime.strptime(target_date_str, '%Y%m%d')  # 格式錯誤時與原本一樣拋出 ValueError
+        def to_day(d: str) -> np.datetime64:
+            return np.datetime64(f"{d[:4]}-{d[4:6]}-{d[6:]}", 'D')
+        
+        holidays = [to_day(d) for d in self.twse_holidays if len(d) == 8 and d.isdigit()]
+        offsets = np.arange(-(count - 1), 1)
+        days = np.busday_offset(to_day(target_date_str), offsets, roll='backward', holidays=holidays)
+        return [str(d).replace('-', '') for d in days]
+
+    def _days_until(self, target_date_str: str, count: int) -> List[str]:
+        """回傳小於等於 target_date_str 的最後 count 個交易日"""
+        end = bisect.bisect_right(self.trading_days, target_date_str)
+        return self.trading_days[max(end - count, 0):end]
+
     def _fetch_twse_holidays(self) -> List[str]:
         """從 TWSE OpenAPI 獲取當年度休假日"""
         if self.twse_holidays and len(self.twse_holidays) > 0:
@@ -232,19 +243,46 @@ class TradingCalendar:
 
 # 提供統一的單例供其他模組匯入使用
 _calendar_instance = None
+_calendar_lock = threading.Lock()
 
 def get_calendar() -> TradingCalendar:
     global _calendar_instance
     if _calendar_instance is None:
-        _calendar_instance = TradingCalendar()
-        # 自動初始化或更新(若需要)
-        _calendar_instance.update_calendar()
+        with _calendar_lock:
+            # 併發呼叫時只建立一次單例，避免重複向 Yahoo 下載日曆
+            if _calendar_instance is None:
+                calendar = TradingCalendar()
+                # 自動初始化或更新(若需要)
+                calendar.update_calendar()
+                _calendar_instance = calendar
     return _calendar_instance
 
+# get_previous_trading_days 的查詢結果，以 (日期, 天數, 緩衝天數) 為鍵；每個鍵各自一把鎖
+_previous_days_cache = {}
+_previous_days_locks = {}
+_previous_days_locks_guard = threading.Lock()
+
 def get_previous_trading_days(target_date_str: str, num_days: int, buffer_days: int = 0) -> List[str]:
-    """快捷函數，直接調用全域日曆實例"""
-    cal = get_calendar()
-    return cal.get_previous_trading_days(target_date_str, num_days, buffer_days=buffer_days)
+    """
+    快捷函數，直接調用全域日曆實例
+    
+    同一組參數在同一次執行中只查詢一次：目標日尚未收錄時每次查詢都可能強制向 Yahoo 更新日曆，
+    歷史模組會以相同參數併發呼叫多次。每組參數各自加鎖，相同參數只有第一個呼叫真正查詢，
+    其他參數的查詢不必等待這次日曆更新。空結果 (例如日曆抓取失敗) 不寫入快取，下次呼叫會重新查詢
+    """
+    key = (target_date_str, num_days, buffer_days)
+    days = _previous_days_cache.get(key)
+    if days is None:
+        with _previous_days_locks_guard:
+            key_lock = _previous_days_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            days = _previous_days_cache.get(key)
+            if days is None:
+                days = tuple(get_calendar().get_previous_trading_days(target_date_str, num_days, buffer_days=buffer_days))
+                if not days:
+                    return []
+                _previous_days_cache[key] = days
+    return list(days)
 
 def get_future_trading_days(target_date_str: str, num_days: int) -> List[str]:
     """快捷函數：取得未來的交易日"""
@@ -0,0 +1,63 @@
+import os
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src import disk_cache
+
+
+class DiskCacheTests(unittest.TestCase):
+    def test_past_date_entries_never_expire(self):
+        with TemporaryDirectory() as temp_dir, mock.patch.object(disk_cache, "CACHE_ROOT", Path(temp_dir)):
+            disk_cache.store("twse", "BFI82U_20200102", {"stat": "OK"})
+            path = disk_cache.cache_path("twse", "BFI82U_20200102")
+            old = time.time() - 30 * 86400
+            os.utime(path, (old, old))
+
+            self.assertEqual(disk_cache.load("twse", "BFI82U_20200102", "20200102"), {"stat": "OK"})
+
+    def test_today_entries_expire_after_ttl(self):
+        today = time.strftime("%Y%m%d")
+        with TemporaryDirectory() as temp_dir, mock.patch.object(disk_cache, "CACHE_ROOT", Path(temp_dir)):
+            disk_cache.store("twse", f"BFI82U_{today}", [1, 2])
+            self.assertEqual(disk_cache.load("twse", f"BFI82U_{today}", today), [1, 2])
+
+            path = disk_cache.cache_path("twse", f"BFI82U_{today}")
+            old = time.time() - disk_cache.TODAY_TTL_SECONDS - 1
+            os.utime(path, (old, old))
+
+            self.assertIsNone(disk_cache.load("twse", f"BFI82U_{today}", today))
+
+    def test_past_date_entries_written_before_settling_expire_after_ttl(self):
+        with TemporaryDirectory() as temp_dir, mock.patch.object(disk_cache, "CACHE_ROOT", Path(temp_dir)):
+            disk_cache.store("twse", "BFI82U_20200102", {"stat": "OK"})
+            path = disk_cache.cache_path("twse", "BFI82U_20200102")
+            intraday = time.mktime((2020, 1, 2, 11, 0, 0, 0, 0, -1))
+            os.utime(path, (intraday, intraday))
+
+            self.assertIsNone(disk_cache.load("twse", "BFI82U_20200102", "20200102"))
+
+    def test_bypass_reads_ignores_entries_written_before_the_call(self):
+        with TemporaryDirectory() as temp_dir, mock.patch.object(disk_cache, "CACHE_ROOT", Path(temp_dir)), \
+                mock.patch.object(disk_cache, "_bypass_reads", {}):
+            disk_cache.store("twse", "BFI82U_20200102", "old")
+            path = disk_cache.cache_path("twse", "BFI82U_20200102")
+            old = time.time() - 30 * 86400
+            os.utime(path, (old, old))
+
+            disk_cache.bypass_reads("twse")
+            self.assertIsNone(disk_cache.load("twse", "BFI82U_20200102", "20200102"))
+
+            disk_cache.store("twse", "BFI82U_20200102", "new")
+            self.assertEqual(disk_cache.load("twse", "BFI82U_20200102", "20200102"), "new")
+
+    def test_cache_path_sanitizes_symbols(self):
+        path = disk_cache.cache_path("yfinance_history", "^TWII_20260611")
+
+        self.assertEqual(path.name, "_TWII_20260611.pkl")
+
+
+if __name__ == "__main__":
+    unittest.main()
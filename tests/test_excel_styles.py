@@ -0,0 +1,16 @@
+import unittest
+
+from src.excel_styles import sign_font
+
+
+class SignFontTests(unittest.TestCase):
+    def test_picks_font_by_sign_and_leaves_zero_and_missing_uncoloured(self):
+        self.assertEqual(sign_font(12, "green", "red"), "green")
+        self.assertEqual(sign_font(-3.5, "green", "red"), "red")
+        self.assertIsNone(sign_font(0, "green", "red"))
+        self.assertIsNone(sign_font(None, "green", "red"))
+        self.assertIsNone(sign_font(float("nan"), "green", "red"))
+
+
+if __name__ == "__main__":
+    unittest.main()
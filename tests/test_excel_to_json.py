@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import excel_to_json
+
+
+class BatchConvertTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.manifest = self.root / "cache" / "manifest.json"
+        patcher = mock.patch.object(excel_to_json, "HASH_MANIFEST_PATH", str(self.manifest))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        self.input_dir = self.root / "xlsx"
+        self.output_dir = self.root / "json"
+        self.input_dir.mkdir()
+        self.xlsx = self.input_dir / "20260612.xlsx"
+        self.xlsx.write_bytes(b"workbook")
+
+    def _convert(self):
+        def fake_convert(input_path, output_path):
+            Path(output_path).write_text("{}", encoding="utf-8")
+            return True
+
+        with mock.patch.object(excel_to_json, "convert_excel_to_json", side_effect=fake_convert) as convert, \
+                mock.patch.object(excel_to_json, "convert_json_to_txt"), \
+                mock.patch.object(excel_to_json, "_file_hash", wraps=excel_to_json._file_hash) as file_hash, \
+                mock.patch("builtins.print"):
+            excel_to_json.batch_convert(str(self.input_dir), str(self.output_dir))
+        return convert.call_count, file_hash.call_count
+
+    def test_hashes_live_outside_the_output_directory(self):
+        self._convert()
+
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["20260612.json"])
+        self.assertTrue(self.manifest.exists())
+
+    def test_touched_workbook_is_hashed_once_and_not_reconverted(self):
+        self.assertEqual(self._convert(), (1, 1))
+        self.assertEqual(self._convert(), (0, 0))
+
+        json_mtime = os.path.getmtime(self.output_dir / "20260612.json")
+        os.utime(self.xlsx, (json_mtime + 10, json_mtime + 10))
+        self.assertEqual(self._convert(), (0, 1))
+        self.assertEqual(self._convert(), (0, 0))
+
+        self.xlsx.write_bytes(b"edited workbook")
+        os.utime(self.xlsx, (json_mtime + 20, json_mtime + 20))
+        self.assertEqual(self._convert(), (1, 1))
+
+
+class ProcessPoolTests(unittest.TestCase):
+    def test_spawn_platforms_use_processes_only_from_the_cli(self):
+        with mock.patch.object(excel_to_json.multiprocessing, "get_start_method", return_value="spawn"):
+            self.assertFalse(excel_to_json._can_use_processes())
+        with mock.patch.object(excel_to_json.multiprocessing, "get_start_method", return_value="fork"):
+            self.assertTrue(excel_to_json._can_use_processes())
+
+    def test_worker_output_is_returned_instead_of_printed(self):
+        def noisy_convert(input_path, output_path):
+            print(f"[INFO] 正在讀取 Excel: {input_path}")
+            return True
+
+        with mock.patch.object(excel_to_json, "convert_excel_to_json", side_effect=noisy_convert), \
+                mock.patch("sys.stdout") as stdout:
+            result = excel_to_json._convert_captured("a.xlsx", "a.json")
+
+        self.assertEqual(result, (True, "[INFO] 正在讀取 Excel: a.xlsx\n"))
+        stdout.write.assert_not_called()
+
+
+class ConvertExcelToJsonTests(unittest.TestCase):
+    def test_numeric_headers_become_string_keys(self):
+        from openpyxl import Workbook
+
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = Path(tmp) / "global.xlsx"
+            wb = Workbook()
+            ws = wb.active
+            ws.title = "Global Markets"
+            ws.append(["指標", 2024, 2025])
+            ws.append(["VIX", 13.5, 18.25])
+            wb.save(xlsx)
+
+            fast_path = Path(tmp) / "fast.json"
+            slow_path = Path(tmp) / "slow.json"
+            with mock.patch.object(excel_to_json, "convert_json_to_txt"), mock.patch("builtins.print"):
+                self.assertTrue(excel_to_json.convert_excel_to_json(str(xlsx), str(fast_path)))
+                with mock.patch.object(excel_to_json, "orjson", None):
+                    self.assertTrue(excel_to_json.convert_excel_to_json(str(xlsx), str(slow_path)))
+
+            self.assertEqual(fast_path.read_text(encoding="utf-8"), slow_path.read_text(encoding="utf-8"))
+            self.assertEqual(json.loads(fast_path.read_text(encoding="utf-8")),
+                             {"Global Markets": [{"指標": "VIX", "2024": 13.5, "2025": 18.25}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+from src import http_utils
+
+
+class WaitForHostTests(unittest.TestCase):
+    def test_requests_to_the_same_host_share_one_limiter(self):
+        twse = mock.Mock()
+        with mock.patch.dict(http_utils.HOST_LIMITERS, {"www.twse.com.tw": twse}, clear=True):
+            http_utils.wait_for_host("https://www.twse.com.tw/fund/BFI82U")
+            http_utils.wait_for_host("https://www.twse.com.tw/rwd/zh/fund/T86?date=20260611")
+            http_utils.wait_for_host("https://www.warrantwin.com.tw/eyuanta/Warrant/Info.aspx")
+
+        self.assertEqual(twse.wait.call_count, 2)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_consecutive_waits_are_spaced_by_min_interval(self):
+        limiter = http_utils.RateLimiter(1.5)
+        with mock.patch.object(http_utils.time, "monotonic", return_value=100.0), \
+                mock.patch.object(http_utils.time, "sleep") as sleep:
+            limiter.wait()
+            limiter.wait()
+            limiter.wait()
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1.5, 3.0])
+
+
+
+class RetryAfterSecondsTests(unittest.TestCase):
+    def test_reads_seconds_and_falls_back_to_default(self):
+        response = mock.Mock(headers={"Retry-After": "7"})
+        self.assertEqual(http_utils.retry_after_seconds(response, 3), 7.0)
+        self.assertEqual(http_utils.retry_after_seconds(mock.Mock(headers={}), 3), 3)
+        self.assertEqual(http_utils.retry_after_seconds(mock.Mock(headers={"Retry-After": "soon"}), 3), 3)
+
+    def test_past_http_date_means_no_wait(self):
+        response = mock.Mock(headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        self.assertEqual(http_utils.retry_after_seconds(response, 3), 0.0)
+
+
+
+class PacedGetTests(unittest.TestCase):
+    def test_retries_through_the_limiter_and_honours_retry_after(self):
+        limiter = mock.Mock()
+        session = mock.Mock()
+        session.get.side_effect = [
+            mock.Mock(status_code=429, headers={"Retry-After": "4"}),
+            mock.Mock(status_code=503, headers={}),
+            mock.Mock(status_code=200, headers={}),
+        ]
+        with mock.patch.dict(http_utils.HOST_LIMITERS, {"www.twse.com.tw": limiter}, clear=True), \
+                mock.patch.object(http_utils.time, "sleep") as sleep:
+            response = http_utils.paced_get(session, "https://www.twse.com.tw/fund/BFI82U", timeout=10)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(limiter.wait.call_count, 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [4.0, 1.0])
+
+    def test_returns_the_last_response_when_retries_run_out(self):
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(status_code=502, headers={})
+        with mock.patch.dict(http_utils.HOST_LIMITERS, clear=True), mock.patch.object(http_utils.time, "sleep"):
+            response = http_utils.paced_get(session, "https://www.taifex.com.tw/cht/3/futContractsDate", retries=2)
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(session.get.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
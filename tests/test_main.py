@@ -0,0 +1,174 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+class FakeRiskMonitor:
+    def __init__(self, date_str):
+        self.data = {}
+
+    def fetch_all_data(self, verbose=True):
+        self.data = {"date": "20260611", "indicators": []}
+
+
+class FakeHistoricalDataFetcher:
+    def __init__(self, date_str):
+        pass
+
+    def fetch_institutional_history(self, num_days):
+        return {"foreign_5d_avg": 12.5}
+
+    def fetch_margin_history(self, num_days):
+        raise RuntimeError("TWSE timeout")
+
+    def fetch_pc_ratio_history(self, num_days):
+        return {"pc_5d_avg": 110.2}
+
+    def fetch_futures_history(self, num_days):
+        return {"futures_5d_avg": -20000}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FakeStockMonitor:
+    def __init__(self, date_str, watchlist_path, refresh=False):
+        self.stock_data = {}
+        self.warrant_data = {}
+
+    def load_watchlist(self):
+        return []
+
+    def fetch_all_data(self):
+        self.stock_data = {"2330": {"code": "2330"}}
+
+
+class FailingRiskMonitor(FakeRiskMonitor):
+    def fetch_all_data(self, verbose=True):
+        raise RuntimeError("TWSE down")
+
+
+class BrokenStockMonitor(FakeStockMonitor):
+    def __init__(self, date_str, watchlist_path, refresh=False):
+        raise ValueError("bad watchlist")
+
+
+class CompleteHistoricalDataFetcher(FakeHistoricalDataFetcher):
+    calls = 0
+
+    def fetch_margin_history(self, num_days):
+        type(self).calls += 1
+        return {"margin_20d_change": 35.0}
+
+
+class IntegratedRiskReportTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(main.disk_cache, "CACHE_ROOT", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(main.disk_cache, "_bypass_reads", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fetch(self, fetcher_cls, refresh=False, risk_monitor_cls=FakeRiskMonitor, stock_monitor_cls=FakeStockMonitor):
+        monitors = (risk_monitor_cls, fetcher_cls, stock_monitor_cls)
+        with mock.patch.object(main, "_import_monitors", return_value=monitors), \
+                mock.patch("builtins.print"):
+            report = main.IntegratedRiskReport("20260611", refresh=refresh)
+            report.fetch_all_data()
+        return report
+
+    def test_complete_history_is_reused_until_refresh_is_requested(self):
+        CompleteHistoricalDataFetcher.calls = 0
+
+        first = self._fetch(CompleteHistoricalDataFetcher)
+        second = self._fetch(CompleteHistoricalDataFetcher)
+        self.assertEqual(CompleteHistoricalDataFetcher.calls, 1)
+        self.assertEqual(second.history_data, first.history_data)
+
+        self._fetch(CompleteHistoricalDataFetcher, refresh=True)
+        self.assertEqual(CompleteHistoricalDataFetcher.calls, 2)
+
+    def test_incomplete_history_is_not_cached(self):
+        self._fetch(FakeHistoricalDataFetcher)
+        self.assertFalse(main.disk_cache.cache_path("risk_history", "20260611").exists())
+
+    def test_help_does_not_import_openpyxl_or_monitors(self):
+        code = "import sys, main; assert 'openpyxl' not in sys.modules and 'pandas' not in sys.modules"
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_fetch_all_data_keeps_other_sources_when_one_history_fetch_fails(self):
+        report = self._fetch(FakeHistoricalDataFetcher)
+
+        self.assertEqual(report.single_day_data["indicators"], [])
+        self.assertEqual(report.history_data["institutional"], {"foreign_5d_avg": 12.5})
+        self.assertEqual(report.history_data["margin"], {})
+        self.assertEqual(report.history_data["pc_ratio"], {"pc_5d_avg": 110.2})
+        self.assertEqual(report.history_data["futures"], {"futures_5d_avg": -20000})
+        self.assertIn("2330", report.stock_data)
+
+    def test_single_day_failure_aborts_the_report(self):
+        with self.assertRaises(RuntimeError):
+            self._fetch(FakeHistoricalDataFetcher, risk_monitor_cls=FailingRiskMonitor)
+
+    def test_stock_monitor_construction_failure_leaves_stock_data_empty(self):
+        report = self._fetch(FakeHistoricalDataFetcher, stock_monitor_cls=BrokenStockMonitor)
+
+        self.assertEqual(report.stock_data, {})
+        self.assertEqual(report.warrant_data, {})
+        self.assertEqual(report.history_data["institutional"], {"foreign_5d_avg": 12.5})
+
+
+class FormatStatTests(unittest.TestCase):
+    def test_missing_history_values_render_as_bare_dash(self):
+        self.assertEqual(main.IntegratedRiskReport._format_stat(-12.5, "億"), "-12.5億")
+        self.assertEqual(main.IntegratedRiskReport._format_stat(0, "口"), "0口")
+        self.assertEqual(main.IntegratedRiskReport._format_stat(None, "%"), "-")
+
+
+class SummaryRowsTests(unittest.TestCase):
+    def test_build_summary_rows_formats_values_and_history_stats(self):
+        report = main.IntegratedRiskReport("20260611")
+        report.single_day_data = {"indicators": [
+            {"category": "籌碼", "name": "外資現貨", "value": -50.2, "change": None, "unit": "億"},
+            {"category": "大盤", "name": "加權指數 (TWII)", "value": None, "change": 1.234, "unit": ""},
+        ]}
+        report.history_data = {"institutional": {"foreign_5d_avg": 1.5, "foreign_5d_sum": 7.5}}
+
+        with mock.patch.object(report, "_load_5d_market_stats", return_value={"加權指數 (TWII)": 20000.5}):
+            rows = report._build_summary_rows()
+
+        self.assertEqual(rows, [
+            ["籌碼", "外資現貨", "-50.2億", "", "1.5億", "7.5億", "-", "-"],
+            ["大盤", "加權指數 (TWII)", "N/A", "+1.23%", "20000.5", "", "", ""],
+        ])
+
+
+class ResolveTradingDateTests(unittest.TestCase):
+    def test_explicit_weekday_is_used_without_loading_risk_monitor(self):
+        with mock.patch.object(main, "_import_get_trading_date") as importer:
+            self.assertEqual(main._resolve_trading_date("20260611"), "20260611")
+        importer.assert_not_called()
+
+    def test_weekend_falls_back_to_friday(self):
+        self.assertEqual(main._resolve_trading_date("20260613"), "20260612")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,284 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import disk_cache, http_utils, risk_monitor
+
+
+YAHOO_KEYS = tuple(risk_monitor.YahooFinanceFetcher.SYMBOLS)
+
+
+class FakeYahooFinanceFetcher:
+    def __init__(self, date_str):
+        pass
+
+    def fetch_all(self):
+        return {
+            key: {"value": 100.0, "change_pct": 0.5}
+            for key in YAHOO_KEYS
+        }
+
+
+class FakeTWSEFetcher:
+    def __init__(self, date_str):
+        pass
+
+    def fetch_institutional_investors(self):
+        return {"foreign_net": -50.2, "trust_net": 10.0, "dealer_net": 1.0, "total_net": -39.2}
+
+    def fetch_margin_trading(self):
+        return {"margin_change": None}
+
+
+class FakeTAIFEXFetcher:
+    def __init__(self, date_str):
+        pass
+
+    def fetch_options_pc_ratio(self):
+        return 110.0
+
+    def fetch_futures_position(self):
+        return {"foreign_net": -30000}
+
+    def fetch_tx_settlement(self):
+        return {"value": 20000.0, "change_pct": 1.2}
+
+
+class RiskMonitorFetchAllDataTests(unittest.TestCase):
+    def test_concurrent_fetch_assembles_every_indicator(self):
+        with mock.patch.object(risk_monitor, "YahooFinanceFetcher", FakeYahooFinanceFetcher), \
+                mock.patch.object(risk_monitor, "TWSEFetcher", FakeTWSEFetcher), \
+                mock.patch.object(risk_monitor, "TAIFEXFetcher", FakeTAIFEXFetcher), \
+                mock.patch("builtins.print"):
+            monitor = risk_monitor.RiskMonitor("20260611")
+            monitor.fetch_all_data()
+
+        values = {item["name"]: item["value"] for item in monitor.data["indicators"]}
+        self.assertEqual(len(values), 15)
+        self.assertEqual(values["台指近月期貨"], 20000.0)
+        self.assertEqual(values["外資現貨"], -50.2)
+        self.assertEqual(values["選擇權 P/C Ratio"], 110.0)
+        self.assertEqual(values["外資期貨未平倉"], -30000)
+        self.assertIsNone(values["融資融券變化"])
+
+    def test_export_json_matches_stdlib_output(self):
+        monitor = risk_monitor.RiskMonitor("20260611")
+        monitor.data = {"date": "20260611", "indicators": [
+            {"category": "籌碼", "name": "外資現貨", "value": -50.2, "change": None, "unit": "億", "risk": "警戒"},
+        ]}
+        with tempfile.TemporaryDirectory() as tmp, mock.patch("builtins.print"):
+            fast_path = Path(tmp) / "fast.json"
+            slow_path = Path(tmp) / "slow.json"
+            monitor.export_json(str(fast_path))
+            with mock.patch.object(risk_monitor, "orjson", None):
+                monitor.export_json(str(slow_path))
+
+            self.assertEqual(fast_path.read_text(encoding="utf-8"), slow_path.read_text(encoding="utf-8"))
+
+    def test_export_json_accepts_numpy_floats_from_fetchers(self):
+        monitor = risk_monitor.RiskMonitor("20260611")
+        # YahooFinanceFetcher 以 round(closes.iat[idx], 2) 產生數值，型別為 numpy.float64
+        closes = pd.Series([18.456, 19.1234])
+        monitor.data = {"date": "20260611", "indicators": [
+            {"category": "國際", "name": "VIX", "value": round(closes.iat[1], 2),
+             "change": round(closes.iat[1] - closes.iat[0], 2), "unit": "", "risk": "正常"},
+        ]}
+        self.assertIsInstance(monitor.data["indicators"][0]["value"], np.float64)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch("builtins.print"):
+            fast_path = Path(tmp) / "fast.json"
+            slow_path = Path(tmp) / "slow.json"
+            monitor.export_json(str(fast_path))
+            with mock.patch.object(risk_monitor, "orjson", None):
+                monitor.export_json(str(slow_path))
+
+            self.assertEqual(fast_path.read_text(encoding="utf-8"), slow_path.read_text(encoding="utf-8"))
+            self.assertIn('"value": 19.12', fast_path.read_text(encoding="utf-8"))
+
+
+class YahooFinanceFetcherTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(disk_cache, "CACHE_ROOT", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetch_all_downloads_every_symbol_in_one_batch(self):
+        symbols = list(risk_monitor.YahooFinanceFetcher.SYMBOLS.values())
+        index = pd.to_datetime(["2026-06-10", "2026-06-11"])
+        frames = {
+            symbol: pd.DataFrame({"Close": [100.0, 101.0]}, index=index)
+            for symbol in symbols if symbol != "^VIX"
+        }
+        batch = pd.concat(frames, axis=1)
+        single = pd.DataFrame({"Close": [20.0, 18.0]}, index=index)
+
+        fetcher = risk_monitor.YahooFinanceFetcher("20260611")
+        with mock.patch("yfinance.download", return_value=batch) as download, \
+                mock.patch("yfinance.Ticker") as ticker, \
+                mock.patch("builtins.print"):
+            ticker.return_value.history.return_value = single
+            results = fetcher.fetch_all()
+
+        download.assert_called_once()
+        self.assertEqual(download.call_args.args[0], symbols)
+        ticker.assert_called_once_with("^VIX")
+        self.assertEqual(results["taiex"], {"value": 101.0, "change_pct": 1.0})
+        self.assertEqual(results["vix"], {"value": 18.0, "change_pct": -10.0})
+
+        with mock.patch("yfinance.download") as download, \
+                mock.patch("yfinance.Ticker") as ticker:
+            self.assertEqual(fetcher.fetch_all(), results)
+        download.assert_not_called()
+        ticker.assert_not_called()
+
+
+class CachedGetTextTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(disk_cache, "CACHE_ROOT", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(http_utils.HOST_LIMITERS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _response(self, text, status_code=200, headers=None):
+        response = mock.Mock(encoding=None, text=text, status_code=status_code, headers=headers or {})
+        response.raise_for_status.return_value = None
+        return response
+
+    def test_complete_responses_are_served_from_disk(self):
+        url = "https://www.twse.com.tw/fund/BFI82U"
+        params = {"response": "json", "dayDate": "20200102"}
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get",
+                               return_value=self._response('{"stat": "OK"}')) as get:
+            for _ in range(2):
+                text = risk_monitor._cached_get_text(url, params, "20200102", risk_monitor._twse_stat_ok)
+        self.assertEqual(text, '{"stat": "OK"}')
+        get.assert_called_once()
+
+    def test_error_responses_are_not_cached(self):
+        url = "https://www.twse.com.tw/fund/BFI82U"
+        params = {"response": "json", "dayDate": "20200103"}
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get",
+                               return_value=self._response('{"stat": "很抱歉，沒有符合條件的資料!"}')) as get:
+            for _ in range(2):
+                risk_monitor._cached_get_text(url, params, "20200103", risk_monitor._twse_stat_ok)
+        self.assertEqual(get.call_count, 2)
+
+    def test_pages_without_the_expected_table_are_not_cached(self):
+        url = "https://www.taifex.com.tw/cht/3/futContractsDate"
+        params = {"queryDate": "2020/01/02"}
+        layout_only = self._response("<table><tr><td>查無資料</td></tr></table>")
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get", return_value=layout_only):
+            risk_monitor._cached_get_text(url, params, "20200102", risk_monitor._has_table_matching("臺股期貨"))
+
+        self.assertFalse(disk_cache.cache_path("http", f"{url}?queryDate=2020%2F01%2F02").exists())
+
+        complete = self._response(FUTURES_HTML)
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get", return_value=complete):
+            risk_monitor._cached_get_text(url, params, "20200102", risk_monitor._has_table_matching("臺股期貨"))
+
+        self.assertTrue(disk_cache.cache_path("http", f"{url}?queryDate=2020%2F01%2F02").exists())
+
+    def test_expired_entry_is_revalidated_with_etag(self):
+        url = "https://www.taifex.com.tw/cht/3/futContractsDate"
+        params = {"queryDate": "2099/01/02"}
+        first = self._response("<table>v1</table>", headers={"ETag": '"abc"'})
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get", return_value=first):
+            risk_monitor._cached_get_text(url, params, "20990102", risk_monitor._has_table_matching("v1"))
+
+        cached = disk_cache.cache_path("http", f"{url}?queryDate=2099%2F01%2F02")
+        os.utime(cached, (0, 0))
+        with mock.patch.object(risk_monitor.HTTP_SESSION, "get",
+                               return_value=self._response("", status_code=304)) as get:
+            text = risk_monitor._cached_get_text(url, params, "20990102", risk_monitor._has_table_matching("v1"))
+
+        self.assertEqual(text, "<table>v1</table>")
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": '"abc"'})
+
+
+PC_RATIO_HTML = """
+<table><tr><td>查詢日期</td></tr></table>
+<table>
+<tr><th>日期</th><th>買賣權成交量比率%</th><th>買賣權未平倉量比率%</th></tr>
+<tr><td>2026/06/12</td><td>50.1</td><td>99.5</td></tr>
+<tr><td>2026/06/11</td><td>48.7</td><td>120.34</td></tr>
+</table>
+"""
+
+FUTURES_HTML = """
+<table>
+<tr><th>序號</th><th>商品名稱</th><th>身份別</th><th>多方口數</th><th>空方口數</th><th>多空淨額口數</th></tr>
+<tr><td>1</td><td>臺股期貨</td><td>自營商</td><td>500</td><td>400</td><td>100</td></tr>
+<tr><td>2</td><td>臺股期貨</td><td>外資</td><td>20,000</td><td>45,123</td><td>-25,123</td></tr>
+</table>
+"""
+
+SETTLEMENT_HTML = """
+<table><tr><td>商品：臺股期貨 TX 及小型臺指 MTX</td></tr></table>
+<table>
+<tr><th>契約</th><th>到期月份</th><th>開盤價</th><th>最高價</th><th>最低價</th><th>最後成交價</th><th>漲跌價</th><th>漲跌%</th></tr>
+<tr><td>MTX</td><td>202606</td><td>19900</td><td>20100</td><td>19850</td><td>20050</td><td>▲150</td><td>▲0.75%</td></tr>
+</table>
+<table>
+<tr><th>契約</th><th>到期月份</th><th>開盤價</th><th>最高價</th><th>最低價</th><th>最後成交價</th><th>漲跌價</th><th>漲跌%</th></tr>
+<tr><td>TX</td><td>202606</td><td>19950</td><td>20200</td><td>19900</td><td>20150</td><td>▼100</td><td>▼0.49%</td></tr>
+<tr><td>TX</td><td>202607</td><td>19980</td><td>20230</td><td>19930</td><td>20180</td><td>▼90</td><td>▼0.44%</td></tr>
+</table>
+"""
+
+
+class TAIFEXFetcherParseTests(unittest.TestCase):
+    def _fetch(self, method, html):
+        fetcher = risk_monitor.TAIFEXFetcher("20260611")
+        with mock.patch.object(risk_monitor, "_cached_get_text", return_value=html), \
+                mock.patch("builtins.print"):
+            return getattr(fetcher, method)()
+
+    def test_pc_ratio_uses_row_for_query_date(self):
+        self.assertEqual(self._fetch("fetch_options_pc_ratio", PC_RATIO_HTML), 120.34)
+
+    def test_pc_ratio_falls_back_to_first_row(self):
+        html = PC_RATIO_HTML.replace("2026/06/11", "2026/06/10")
+        self.assertEqual(self._fetch("fetch_options_pc_ratio", html), 99.5)
+
+    def test_pages_without_matching_table_return_defaults(self):
+        html = "<table><tr><td>查無資料</td></tr></table>"
+        self.assertIsNone(self._fetch("fetch_options_pc_ratio", html))
+        self.assertEqual(self._fetch("fetch_futures_position", html), {"foreign_net": None})
+
+    def test_futures_position_scans_tx_rows(self):
+        self.assertEqual(self._fetch("fetch_futures_position", FUTURES_HTML), {"foreign_net": 20000})
+
+    def test_tx_settlement_skips_mtx_table(self):
+        self.assertEqual(self._fetch("fetch_tx_settlement", SETTLEMENT_HTML), {"value": 20150.0, "change_pct": -0.49})
+
+    def test_settlement_page_without_tx_contract_is_not_cached(self):
+        is_complete = risk_monitor._has_table_cell("TX")
+        self.assertTrue(is_complete(SETTLEMENT_HTML))
+        self.assertFalse(is_complete(SETTLEMENT_HTML.replace("<td>TX</td>", "<td>ZTX</td>")))
+        self.assertFalse(is_complete("<table><tr><td>查無 TX 資料</td></tr></table>"))
+
+
+class TradingDateTests(unittest.TestCase):
+    def test_weekday_is_kept_and_weekend_rolls_back_to_friday(self):
+        self.assertEqual(risk_monitor.get_trading_date("20260611"), "20260611")
+        self.assertEqual(risk_monitor.get_trading_date("20260613"), "20260612")
+        self.assertEqual(risk_monitor.get_trading_date("20260614"), "20260612")
+
+    def test_malformed_dates_are_rejected(self):
+        for date_str in ("2026061", "2026-06-11", "20261332"):
+            with self.assertRaises(ValueError):
+                risk_monitor.get_trading_date(date_str)
+
+
+if __name__ == "__main__":
+    unittest.main()
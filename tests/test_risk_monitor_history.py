@@ -0,0 +1,125 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import http_utils, risk_monitor_history
+from src.risk_monitor_history import HistoricalDataFetcher
+
+
+TRADING_DAYS = ["20260604", "20260605", "20260608", "20260609", "20260610", "20260611"]
+
+
+def json_response(payload):
+    response = mock.Mock()
+    response.raise_for_status.return_value = None
+    response.content = json.dumps(payload).encode("utf-8")
+    response.json.return_value = payload
+    return response
+
+
+def margin_response(date):
+    if date == "20260608":
+        return json_response({"stat": "很抱歉，沒有符合條件的資料!"})
+    change = int(date[-2:])
+    return json_response({"stat": "OK", "tables": [{"data": [
+        [], [],
+        ["融資金額(仟元)", "1,000,000", f"{1_000_000 + change * 100_000:,}"],
+    ]}]})
+
+
+class HistoricalDataFetcherTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patchers = [
+            mock.patch.object(risk_monitor_history.disk_cache, "CACHE_ROOT", Path(tmp.name)),
+            mock.patch.object(risk_monitor_history, "get_previous_trading_days", return_value=TRADING_DAYS),
+            mock.patch.dict(http_utils.HOST_LIMITERS, clear=True),
+            mock.patch("builtins.print"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_margin_history_keeps_trading_day_order_when_fetched_concurrently(self):
+        def fake_get(url, params, timeout):
+            return margin_response(params["date"])
+
+        with mock.patch.object(risk_monitor_history.requests.Session, "get", side_effect=fake_get):
+            stats = HistoricalDataFetcher("20260611").fetch_margin_history(5)
+
+        self.assertEqual(stats["margin_5d_sum"], 39.0)
+        self.assertEqual(stats["margin_5d_avg"], 7.8)
+        self.assertIsNone(stats["margin_20d_avg"])
+
+    def test_failed_days_are_skipped(self):
+        def fake_get(url, params, timeout):
+            if params["date"] == "20260610":
+                raise TimeoutError("TWSE timeout")
+            return margin_response(params["date"])
+
+        with mock.patch.object(risk_monitor_history.requests.Session, "get", side_effect=fake_get):
+            stats = HistoricalDataFetcher("20260611").fetch_margin_history(5)
+
+        self.assertIsNone(stats["margin_5d_sum"])
+
+    def test_cached_days_are_not_requested_again(self):
+        def fake_get(url, params, timeout):
+            return margin_response(params["date"])
+
+        with mock.patch.object(risk_monitor_history.requests.Session, "get", side_effect=fake_get) as get:
+            first = HistoricalDataFetcher("20260611").fetch_margin_history(5)
+            get.reset_mock()
+            second = HistoricalDataFetcher("20260611").fetch_margin_history(5)
+
+        self.assertEqual(second, first)
+        self.assertEqual([call.kwargs["params"]["date"] for call in get.call_args_list], ["20260608"])
+
+    def test_zero_results_are_cached(self):
+        def fake_get(url, params, timeout):
+            # 融資餘額不變：單日變化為 0.0，仍是有效數值
+            return json_response({"stat": "OK", "tables": [{"data": [
+                [], [], ["融資金額(仟元)", "1,000,000", "1,000,000"],
+            ]}]})
+
+        with mock.patch.object(risk_monitor_history.requests.Session, "get", side_effect=fake_get) as get:
+            HistoricalDataFetcher("20260611").fetch_margin_history(5)
+            get.reset_mock()
+            stats = HistoricalDataFetcher("20260611").fetch_margin_history(5)
+
+        get.assert_not_called()
+        self.assertEqual(stats["margin_5d_sum"], 0.0)
+
+    def test_institutional_rows_are_mapped_by_category(self):
+        response = json_response({"stat": "OK", "data": [
+            ["自營商(自行買賣)", "0", "0", "--"],
+            ["投信", "0", "0", "200,000,000"],
+            ["外資及陸資(不含外資自營商)", "0", "0", "-1,500,000,000"],
+            ["外資自營商", "0", "0", "300,000,000"],
+            ["合計", "0", "0", "-1,000,000,000"],
+        ]})
+
+        with mock.patch.object(risk_monitor_history.requests.Session, "get", return_value=response):
+            day = HistoricalDataFetcher("20260611")._fetch_institutional_day("20260611")
+
+        self.assertEqual(day, {"trust": 2.0, "foreign": -15.0, "total": -10.0})
+
+
+class ParseFuturesNetTests(unittest.TestCase):
+    def test_first_tx_row_large_value_is_returned(self):
+        html = """<html><table><tr><td>x</td></tr></table><table><tbody>
+<tr><th>序號</th><th>商品名稱</th><th>身份別</th><th>多方口數</th><th>空方口數</th><th>多空淨額口數</th></tr>
+<tr><td>1</td><td><div>臺股期貨</div></td><td>外資</td><td>--</td><td>45,123</td><td>-25,123</td></tr>
+<tr><td>2</td><td>臺股期貨</td><td>自營商</td><td>500</td><td>400</td><td>100</td></tr>
+</tbody></table></html>"""
+
+        self.assertEqual(HistoricalDataFetcher._parse_futures_net(html), 45123)
+
+    def test_page_without_tx_row_returns_none(self):
+        self.assertIsNone(HistoricalDataFetcher._parse_futures_net("<table><tr><td>a</td></tr></table>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,256 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import http_utils, stock_monitor
+from src.stock_monitor import StockMonitor
+
+
+class LoadWatchlistTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "watchlist.json"
+        stock_monitor._read_watchlist.cache_clear()
+        self.addCleanup(stock_monitor._read_watchlist.cache_clear)
+
+    def _load(self):
+        monitor = StockMonitor("20260611", str(self.path))
+        with mock.patch("builtins.print"):
+            return monitor.load_watchlist()
+
+    def test_loads_watchlist_with_and_without_orjson(self):
+        entries = [{"code": "2330", "name": "台積電"}]
+        self.path.write_text(json.dumps({"watchlist": entries}, ensure_ascii=False), encoding="utf-8")
+
+        self.assertEqual(self._load(), entries)
+        stock_monitor._read_watchlist.cache_clear()
+        with mock.patch.object(stock_monitor, "orjson", None):
+            self.assertEqual(self._load(), entries)
+
+    def test_unchanged_file_is_parsed_once_and_edits_are_picked_up(self):
+        self.path.write_text(json.dumps({"watchlist": [{"code": "2330"}]}), encoding="utf-8")
+        self.assertEqual(self._load(), [{"code": "2330"}])
+        self.assertEqual(self._load(), [{"code": "2330"}])
+        self.assertEqual(stock_monitor._read_watchlist.cache_info().misses, 1)
+
+        self.path.write_text(json.dumps({"watchlist": [{"code": "2330"}, {"code": "2317"}]}), encoding="utf-8")
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(self._load(), [{"code": "2330"}, {"code": "2317"}])
+
+    def test_malformed_watchlist_returns_empty_list(self):
+        self.path.write_text("{not json", encoding="utf-8")
+
+        self.assertEqual(self._load(), [])
+        stock_monitor._read_watchlist.cache_clear()
+        with mock.patch.object(stock_monitor, "orjson", None):
+            self.assertEqual(self._load(), [])
+
+
+class ParseIntTests(unittest.TestCase):
+    def test_strips_thousands_separators_and_passes_json_ints_through(self):
+        self.assertEqual(stock_monitor._parse_int("1,234,567"), 1234567)
+        self.assertEqual(stock_monitor._parse_int(-42), -42)
+        self.assertEqual(stock_monitor._parse_int("--"), 0)
+        self.assertEqual(stock_monitor._parse_margin_int("--"), 0)
+        self.assertEqual(stock_monitor._parse_margin_int("12,000"), 12000)
+
+
+CANDIDATE_DAYS = [f"202606{day:02d}" for day in (1, 2, 3, 4, 5, 8, 9, 10, 11)]
+
+
+class FakeStockDataFetcher:
+    def __init__(self, date_str):
+        self.date_str = date_str
+
+    def fetch_stock_prices(self, include_warrants=True):
+        if self.date_str == "20260610":
+            return {}
+        return {"2330": {"close": 1000, "volume": int(self.date_str[-2:])}}
+
+    def fetch_institutional_trading(self):
+        return {}
+
+    def fetch_margin_trading(self):
+        return {}
+
+
+class Fetch5dHistoryTests(unittest.TestCase):
+    def test_uses_most_recent_days_with_data(self):
+        monitor = StockMonitor("20260611")
+        monitor.watchlist = [{"code": "2330"}]
+
+        with mock.patch.object(stock_monitor, "get_previous_trading_days", return_value=CANDIDATE_DAYS), \
+                mock.patch.object(stock_monitor, "StockDataFetcher", FakeStockDataFetcher), \
+                mock.patch.object(monitor, "_compute_ma20_from_stored_json", return_value={}), \
+                mock.patch.dict(http_utils.HOST_LIMITERS, clear=True), \
+                mock.patch("builtins.print"):
+            result = monitor._fetch_5d_history()
+
+        self.assertEqual(result["2330"]["volume_5d"], 11 + 9 + 8 + 5 + 4)
+        self.assertFalse(result["2330"]["history_complete"])
+
+
+class CountingStockDataFetcher:
+    calls = 0
+
+    def __init__(self, date_str):
+        type(self).calls += 1
+
+    def fetch_institutional_trading(self):
+        return {"2330": {"foreign_net": 5000}}
+
+    def fetch_margin_trading(self):
+        return {"2330": {"margin_change": 12}}
+
+    def fetch_stock_prices(self):
+        return {"2330": {"close": 1000.0, "market": "上市"}}
+
+
+class FetchAllDataCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(stock_monitor.disk_cache, "CACHE_ROOT", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(stock_monitor.disk_cache, "_bypass_reads", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        CountingStockDataFetcher.calls = 0
+
+    def _fetch(self, refresh=False, history_complete=True):
+        monitor = StockMonitor("20260611", refresh=refresh)
+        monitor.watchlist = [{"code": "2330", "name": "台積電"}]
+        history = {"2330": {"ma20": 990.0, "history_complete": history_complete}}
+        with mock.patch.object(stock_monitor, "StockDataFetcher", CountingStockDataFetcher), \
+                mock.patch.object(monitor, "_fetch_5d_history", return_value=history), \
+                mock.patch("builtins.print"):
+            monitor.fetch_all_data()
+        return monitor
+
+    def test_complete_result_is_reused_until_refresh_is_requested(self):
+        first = self._fetch()
+        second = self._fetch()
+        self.assertEqual(CountingStockDataFetcher.calls, 1)
+        self.assertEqual(second.stock_data, first.stock_data)
+        self.assertEqual(second.stock_data["2330"]["foreign_daily"], 5)
+
+        self._fetch(refresh=True)
+        self.assertEqual(CountingStockDataFetcher.calls, 2)
+
+    def test_partial_history_is_not_cached(self):
+        self._fetch(history_complete=False)
+        self._fetch()
+        self.assertEqual(CountingStockDataFetcher.calls, 2)
+
+
+class ExportToCsvTests(unittest.TestCase):
+    def test_writes_one_row_per_stock_with_blank_missing_values(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        monitor = StockMonitor("20260611")
+        monitor.stock_data = {"2330": {"code": "2330", "name": "台積電", "market": "上市", "close": 1000.0,
+                                       "volume": 25000, "foreign_daily": None, "margin_5d_sum": -12}}
+
+        with mock.patch("builtins.print"):
+            monitor.export_to_csv()
+
+        with open(Path(tmp.name) / "monitor_xlsx" / "stock_monitor_20260611.csv", encoding="utf-8-sig", newline="") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["日期", "股票代號", "股票名稱"])
+        self.assertEqual(lines[1:], ["20260611,2330,台積電,上市,1000.0,25000,,,,,,,-12,,"])
+
+    def test_integer_columns_with_missing_values_keep_float_formatting(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        monitor = StockMonitor("20260611")
+        monitor.stock_data = {
+            "2330": {"code": "2330", "volume": 25000, "margin_5d_sum": -12},
+            "2317": {"code": "2317", "volume": None, "margin_5d_sum": 8},
+        }
+
+        with mock.patch("builtins.print"):
+            monitor.export_to_csv("out.csv")
+
+        with open(Path(tmp.name) / "monitor_xlsx" / "out.csv", encoding="utf-8-sig", newline="") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[1:], [
+            "20260611,2330,,,,25000.0,,,,,,,-12,,",
+            "20260611,2317,,,,,,,,,,,8,,",
+        ])
+
+
+class ImportTests(unittest.TestCase):
+    def test_import_does_not_load_openpyxl(self):
+        code = "import sys; from src import stock_monitor; assert 'openpyxl' not in sys.modules"
+        project_root = Path(__file__).resolve().parents[1]
+        result = subprocess.run([sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class ComputeMa20Tests(unittest.TestCase):
+    def test_uses_only_files_before_report_date(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        json_dir = Path(tmp.name) / "outputs" / "json"
+        json_dir.mkdir(parents=True)
+        for day in range(1, 31):
+            report = {"個股籌碼": [{"股票代號": "2330", "收盤價": 100 + day}]}
+            (json_dir / f"202605{day:02d}.json").write_text(json.dumps(report, ensure_ascii=False), encoding="utf-8")
+
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        monitor = StockMonitor("20260525")
+        monitor.watchlist = [{"code": "2330"}]
+
+        self.assertEqual(monitor._compute_ma20_from_stored_json(), {"2330": 114.5})
+
+
+class CachedGetJsonTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(stock_monitor.disk_cache, "CACHE_ROOT", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(http_utils.HOST_LIMITERS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_twice(self, payload):
+        response = mock.Mock()
+        response.raise_for_status.return_value = None
+        response.json.return_value = payload
+        response.content = json.dumps(payload).encode("utf-8")
+        url = "https://www.tpex.org.tw/web/stock/aftertrading/daily_close_quotes/stk_quote_result.php"
+        with mock.patch.object(stock_monitor.HTTP_SESSION, "get", return_value=response) as get:
+            for _ in range(2):
+                data = stock_monitor._cached_get_json(url, {"d": "115/06/11"}, "20260611", timeout=15)
+        return data, get.call_count
+
+    def test_responses_with_rows_are_served_from_disk(self):
+        payload = {"tables": [{"data": [["6488", "環球晶"]]}]}
+
+        self.assertEqual(self._get_twice(payload), (payload, 1))
+
+    def test_empty_responses_are_not_cached(self):
+        payload = {"stat": "很抱歉，沒有符合條件的資料!", "tables": [{"data": []}]}
+
+        self.assertEqual(self._get_twice(payload), (payload, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
+from unittest import mock
 
+from src import trading_calendar
 from src.trading_calendar import TradingCalendar
 
 
@@ -41,6 +43,56 @@ class TradingCalendarTests(unittest.TestCase):
 
         self.assertEqual(days, ["20260427", "20260428", "20260429"])
 
+    def test_fallback_without_calendar_skips_weekends_and_cached_holidays(self):
+        calendar = TradingCalendar()
+        calendar.trading_days = []
+        calendar.twse_holidays = ["20260216"]
+
+        with mock.patch.object(calendar, "update_calendar"), mock.patch("builtins.print"):
+            days = calendar.get_previous_trading_days("20260217", 3)
+
+        self.assertEqual(days, ["20260212", "20260213", "20260217"])
+
+
+class GetPreviousTradingDaysTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(trading_calendar, "_previous_days_cache", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_lookups_query_the_calendar_once(self):
+        calendar = mock.Mock()
+        calendar.get_previous_trading_days.return_value = ["20260428", "20260429"]
+
+        with mock.patch.object(trading_calendar, "get_calendar", return_value=calendar):
+            first = trading_calendar.get_previous_trading_days("20260429", 2)
+            first.append("20260430")
+            second = trading_calendar.get_previous_trading_days("20260429", 2)
+
+        self.assertEqual(second, ["20260428", "20260429"])
+        calendar.get_previous_trading_days.assert_called_once_with("20260429", 2, buffer_days=0)
+
+    def test_empty_result_is_not_cached(self):
+        calendar = mock.Mock()
+        calendar.get_previous_trading_days.side_effect = [[], ["20260428", "20260429"]]
+
+        with mock.patch.object(trading_calendar, "get_calendar", return_value=calendar):
+            self.assertEqual(trading_calendar.get_previous_trading_days("20260429", 2), [])
+            self.assertEqual(trading_calendar.get_previous_trading_days("20260429", 2), ["20260428", "20260429"])
+
+        self.assertEqual(calendar.get_previous_trading_days.call_count, 2)
+
+    def test_empty_result_keeps_other_cached_dates(self):
+        calendar = mock.Mock()
+        calendar.get_previous_trading_days.side_effect = [["20260428", "20260429"], []]
+
+        with mock.patch.object(trading_calendar, "get_calendar", return_value=calendar):
+            trading_calendar.get_previous_trading_days("20260429", 2)
+            self.assertEqual(trading_calendar.get_previous_trading_days("19900101", 2), [])
+            self.assertEqual(trading_calendar.get_previous_trading_days("20260429", 2), ["20260428", "20260429"])
+
+        self.assertEqual(calendar.get_previous_trading_days.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()